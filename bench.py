@@ -0,0 +1,361 @@
+"""Flux AI Chat benchmark suite.
+
+Runs the agent pipeline against a deterministic local chat model so results
+do not depend on a Gemini key or the network. Model responses can also be
+recorded from the real model once and replayed from a cassette file.
+
+    python bench.py                                # fake model, 50 ms latency
+    python bench.py --latency 0.2 --output new.json --compare old.json
+    python bench.py --record cassette.json         # needs a Gemini key
+    python bench.py --cassette cassette.json
+"""
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import asyncio
+import platform
+import shutil
+import statistics
+import subprocess as sub
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+import flux_ai
+
+REPO_DIR = Path(__file__).resolve().parent
+
+SAMPLE_INPUTS = {
+    "linux_command": "show disk usage of the root filesystem",
+    "weather_gether": "what is the weather in Berlin",
+    "tech_chat": "is ZFS worth it on a laptop?",
+}
+
+COMMAND_XML = """```
+<command>
+    <linux>echo flux</linux>
+    <description>Prints a friendly word. Nothing was harmed.</description>
+</command>
+```"""
+
+PLAN_XML = """```
+<plan>
+    <description>Checks memory and disk, then the heaviest processes.</description>
+    <step id="mem"><linux>free -h</linux></step>
+    <step id="disk"><linux>df -h</linux></step>
+    <step id="top" depends="mem"><linux>ps aux --sort=-%mem | head</linux></step>
+</plan>
+```"""
+
+FORECAST = {
+    "location": {"name": "Berlin", "country": "Germany"},
+    "current": {
+        "temp_c": 12.0, "feelslike_c": 10.5, "condition": {"text": "Partly cloudy"},
+        "wind_kph": 14.4, "humidity": 71
+    }
+}
+
+COLD_START_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import flux_ai
+from PyQt5.QtWidgets import QApplication
+imported = time.perf_counter()
+config_manager = flux_ai.ConfigManager()
+configured = time.perf_counter()
+flux_ai.GeminiChatBot(config_manager)
+bot_ready = time.perf_counter()
+app = QApplication(sys.argv[:1])
+window = flux_ai.FluxAIChatGUI()
+window.show()
+app.processEvents()
+shown = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - start) * 1000,
+    "config_ms": (configured - imported) * 1000,
+    "chat_bot_ms": (bot_ready - configured) * 1000,
+    "window_ms": (shown - bot_ready) * 1000,
+}))
+"""
+
+def prompt_agent(system_prompt: str) -> str:
+    if "Classify" in system_prompt:
+        return "agent_selector"
+    if "Extract city" in system_prompt:
+        return "weather_gether"
+    if "Linux system administrator" in system_prompt:
+        return "linux_command"
+    return "tech_chat"
+
+def message_key(messages: List[BaseMessage]) -> str:
+    # System prompts embed the host's distro and language, so key on the agent instead
+    payload = json.dumps([prompt_agent(messages[0].content), messages[-1].content], ensure_ascii=False)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+class FakeGeminiModel(BaseChatModel):
+    """Deterministic stand-in answering each agent prompt with a canned reply"""
+
+    latency: float = 0.05
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-gemini"
+
+    def reply(self, messages: List[BaseMessage]) -> str:
+        agent, user = prompt_agent(messages[0].content), messages[-1].content
+        if agent == "agent_selector":
+            return flux_ai.guess_agent(user)
+        if agent == "weather_gether":
+            return "<weather_request><city>Berlin</city></weather_request>"
+        if agent == "linux_command":
+            return COMMAND_XML
+        return "Short answer: yes, if you like checksums more than battery life."
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        time.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.reply(messages)))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        await asyncio.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.reply(messages)))])
+
+class CassetteChatModel(BaseChatModel):
+    """Records responses of a real model to a JSON cassette, or replays them"""
+
+    path: str
+    inner: Optional[Any] = None
+    latency: float = 0.0
+    entries: Dict[str, str] = {}
+
+    @property
+    def _llm_type(self) -> str:
+        return "cassette"
+
+    def load(self):
+        if Path(self.path).exists():
+            self.entries = json.loads(Path(self.path).read_text())
+        return self
+
+    def save(self):
+        Path(self.path).write_text(json.dumps(self.entries, indent=2, ensure_ascii=False))
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        key = message_key(messages)
+        if self.inner is not None:
+            self.entries[key] = self.inner.invoke(messages).content
+        elif key not in self.entries:
+            raise KeyError(f"No cassette entry for request {key[:12]}; re-record {self.path}")
+        else:
+            time.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.entries[key]))])
+
+class BenchConfig(flux_ai.ConfigManager):
+    """In-memory config that never touches ~/.flux_ai_chat"""
+
+    def __init__(self, overrides=None):
+        self.config = self.get_default_config()
+        for key_path, value in (overrides or {}).items():
+            self.set(key_path, value)
+
+    def save_config(self):
+        return True
+
+class ForecastHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = json.dumps(FORECAST).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def start_forecast_server() -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ForecastHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    flux_ai.WEATHER_API_URL = f"http://127.0.0.1:{server.server_address[1]}/v1/forecast.json"
+    return server
+
+def measure(func, runs: int) -> Dict[str, float]:
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        "runs": runs,
+        "min_ms": round(samples[0], 3),
+        "median_ms": round(statistics.median(samples), 3),
+        "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3),
+    }
+
+def bench_cold_start(runs: int) -> Dict[str, Any]:
+    """Launch to first shown window: import, config, chat bot and GUI, in a throwaway home"""
+    home = Path(tempfile.mkdtemp(prefix="flux-bench-"))
+    (home / ".flux_ai_chat").mkdir()
+    (home / ".flux_ai_chat" / "config.json").write_text(json.dumps({"api_keys": {"gemini": "bench"}}))
+    env = dict(os.environ, HOME=str(home))
+    stages = []
+    
+    def launch():
+        output = sub.run(
+            [sys.executable, "-c", COLD_START_SCRIPT], cwd=REPO_DIR, env=env,
+            check=True, capture_output=True, text=True
+        ).stdout
+        stages.append(json.loads(output.strip().splitlines()[-1]))
+    
+    try:
+        results = {"cold_start": measure(launch, runs)}
+    finally:
+        shutil.rmtree(home, ignore_errors=True)
+    for stage in stages[0]:
+        results[f"cold_start.{stage[:-3]}"] = {
+            "median_ms": round(statistics.median(sample[stage] for sample in stages), 3)
+        }
+    return results
+
+def bench_pipeline(chat_bot, config_manager, runs: int, latency: float) -> Dict[str, Any]:
+    routing = measure(lambda: flux_ai.agent_selector(chat_bot, SAMPLE_INPUTS["tech_chat"]), runs)
+    results = {
+        "routing": routing,
+        # Time spent in our own code around the (simulated) model round trip
+        "routing_overhead": {"median_ms": round(routing["median_ms"] - latency * 1000, 3)},
+    }
+    for agent_type, text in SAMPLE_INPUTS.items():
+        results[f"end_to_end.{agent_type}"] = measure(
+            lambda: flux_ai.handle_message(text, chat_bot, config_manager), runs
+        )
+    return results
+
+def bench_parsing(runs: int) -> Dict[str, Any]:
+    return {
+        "xml_parse.command": measure(lambda: flux_ai.parse_command_plan(COMMAND_XML), runs),
+        "xml_parse.plan": measure(lambda: flux_ai.parse_command_plan(PLAN_XML), runs),
+        "command_exec": measure(lambda: flux_ai.execute_command("true"), max(1, runs // 10)),
+    }
+
+def bench_chat_view(sizes: List[int]) -> Dict[str, Any]:
+    from PyQt5.QtWidgets import QApplication, QTextEdit
+
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    user_html = flux_ai.render_user_message(SAMPLE_INPUTS["tech_chat"], "12:00")
+    reply_html = flux_ai.render_response(
+        "linux_command", ("echo flux", "Prints a word.", "✅ Output:\nflux"), "12:00"
+    )
+    results = {}
+    for size in sizes:
+        view = QTextEdit()
+        view.setReadOnly(True)
+        start = time.perf_counter()
+        for i in range(size):
+            view.append(user_html if i % 2 == 0 else reply_html)
+        fill_ms = (time.perf_counter() - start) * 1000
+        last = measure(lambda: view.append(reply_html), 5)
+        render = measure(lambda: (view.viewport().repaint(), app.processEvents()), 5)
+        results[f"chat_view.{size}"] = {
+            "fill_ms": round(fill_ms, 3),
+            "append_median_ms": last["median_ms"],
+            "render_median_ms": render["median_ms"],
+        }
+        view.deleteLater()
+        app.processEvents()
+    return results
+
+def bench_tts(runs: int) -> Dict[str, float]:
+    import pygame
+
+    def first_audio():
+        temp_file = flux_ai.synthesize_voice("Disk usage looks fine.", "en")
+        pygame.mixer.init()
+        pygame.mixer.music.load(str(temp_file))
+        pygame.mixer.music.play()
+        pygame.mixer.music.stop()
+        pygame.quit()
+
+    return measure(first_audio, runs)
+
+def git_revision() -> str:
+    try:
+        return sub.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR, text=True).strip()
+    except Exception:
+        return "unknown"
+
+def compare(current: Dict[str, Any], baseline_path: str):
+    baseline = json.loads(Path(baseline_path).read_text())["results"]
+    print(f"\n{'metric':40} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name, values in current.items():
+        field = "median_ms" if "median_ms" in values else "fill_ms"
+        old = baseline.get(name, {}).get(field)
+        if not old:
+            continue
+        new = values[field]
+        print(f"{name:40} {old:12.3f} {new:12.3f} {(new - old) / old:+8.1%}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Flux AI Chat benchmarks")
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.05, help="fake model latency in seconds")
+    parser.add_argument("--cassette", help="replay model responses from this cassette")
+    parser.add_argument("--record", metavar="CASSETTE", help="record real Gemini responses to this cassette")
+    parser.add_argument("--sizes", default="10,1000,10000", help="chat view sizes in messages")
+    parser.add_argument("--tts", action="store_true", help="include TTS time-to-first-audio (needs network)")
+    parser.add_argument("--skip-gui", action="store_true")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", metavar="BASELINE", help="previous results file to compare against")
+    args = parser.parse_args()
+
+    config_manager = BenchConfig({"api_keys.weather": "bench"})
+    if args.record:
+        inner = flux_ai.GeminiChatBot(flux_ai.ConfigManager()).get_model()
+        model = CassetteChatModel(path=args.record, inner=inner).load()
+    elif args.cassette:
+        model = CassetteChatModel(path=args.cassette, latency=args.latency).load()
+    else:
+        model = FakeGeminiModel(latency=args.latency)
+    chat_bot = flux_ai.GeminiChatBot(config_manager, model=model)
+    forecast_server = start_forecast_server()
+
+    results = bench_cold_start(max(1, args.runs // 4))
+    results.update(bench_pipeline(chat_bot, config_manager, args.runs, args.latency))
+    results.update(bench_parsing(args.runs * 10))
+    if not args.skip_gui:
+        results.update(bench_chat_view([int(size) for size in args.sizes.split(",")]))
+    if args.tts:
+        results["tts_first_audio"] = bench_tts(max(1, args.runs // 4))
+
+    forecast_server.shutdown()
+    if args.record:
+        model.save()
+
+    report = {
+        "revision": git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "model": model._llm_type,
+        "latency_s": args.latency,
+        "results": results,
+    }
+    Path(args.output).write_text(json.dumps(report, indent=2))
+    for name, values in results.items():
+        print(f"{name:40} {values}")
+    print(f"\nWrote {args.output}")
+    if args.compare:
+        compare(results, args.compare)
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,33 @@
 import os
 import sys
 import json
-from typing import Optional, Tuple
+import argparse
+import asyncio
+import contextvars
+import cProfile
+import functools
+import gc
+import pstats
+import tracemalloc
+import weakref
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeout
+from contextlib import contextmanager
+import queue
+import socket
+import socketserver
+import sqlite3
+import threading
+import uuid
+from typing import Any, List, Optional, Tuple
 from pathlib import Path
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.runnables import RunnableLambda
 import logging
 import xml.etree.ElementTree as ET
 import re
@@ -28,6 +50,14 @@ logger = logging.getLogger(__name__)
 # Global language variable
 language = "English"
 
+AGENT_TYPES = ['linux_command', 'weather_gether', 'tech_chat']
+DAEMON_SOCKET = Path.home() / ".flux_ai_chat" / "daemon.sock"
+TRACE_FILE = Path.home() / ".flux_ai_chat" / "traces.jsonl"
+TRACE_FILE_MAX_BYTES = 5 * 1024 * 1024
+PROFILE_DIR = Path.home() / ".flux_ai_chat" / "profiles"
+SESSIONS_DIR = Path.home() / ".flux_ai_chat" / "sessions"
+HISTORY_DB = Path.home() / ".flux_ai_chat" / "history.db"
+
 class ConfigManager:
     """Manages application configuration"""
     
@@ -44,18 +74,53 @@ class ConfigManager:
         if self.config_file.exists():
             try:
                 with open(self.config_file, 'r') as f:
-                    self.config = json.load(f)
+                    # Sections added in newer versions fall back to their defaults
+                    self.config = self.merge_defaults(self.get_default_config(), json.load(f))
             except:
                 self.config = self.get_default_config()
         else:
             self.config = self.get_default_config()
             self.save_config()
     
+    @classmethod
+    def merge_defaults(cls, defaults, loaded):
+        merged = dict(defaults)
+        for key, value in loaded.items():
+            if isinstance(value, dict) and isinstance(merged.get(key), dict):
+                merged[key] = cls.merge_defaults(merged[key], value)
+            else:
+                merged[key] = value
+        return merged
+    
     def get_default_config(self):
         return {
             "api_keys": {"gemini": "", "weather": ""},
             "preferences": {"language": "English", "voice_enabled": False, "voice_volume": 0.7},
-            "advanced": {"model": "gemini-1.5-flash", "temperature": 0.7, "max_tokens": 2048}
+            "providers": {
+                "gemini": {"type": "gemini"},
+                "local": {"type": "openai", "base_url": "http://127.0.0.1:8080/v1", "model": "local", "pool_size": 4}
+            },
+            "agents": {
+                "agent_selector": {"provider": "gemini", "model": "gemini-1.5-flash-8b", "max_tokens": 16},
+                "weather_gether": {
+                    "provider": "gemini", "model": "gemini-1.5-flash-8b", "max_tokens": 64,
+                    "escalate": {"provider": "gemini", "model": "gemini-1.5-flash"}
+                },
+                "linux_command": {
+                    "provider": "gemini", "max_tokens": 1024,
+                    "escalate": {"provider": "gemini", "model": "gemini-1.5-pro", "max_tokens": 2048}
+                },
+                "tech_chat": {"provider": "gemini", "max_tokens": 512}
+            },
+            "deadlines": {
+                "default": 30, "agent_selector": 8, "weather_gether": 20,
+                "linux_command": 45, "tech_chat": 30, "tts": 15
+            },
+            "debug": {"tracing": False, "stall_threshold_ms": 200},
+            "advanced": {
+                "model": "gemini-1.5-flash", "temperature": 0.7, "max_tokens": 2048, "max_concurrency": 4,
+                "max_parallel_commands": 4, "escalation_word_limit": 25, "speculation": False, "speculative_agent": "tech_chat"
+            }
         }
     
     def save_config(self):
@@ -96,17 +161,278 @@ def detect_system_info():
             return "Linux"
     return system
 
-def play_voice(text, volume=0.7, lang="en"):
+# Trace of the chat message being handled in the current thread/task, if tracing is on
+current_trace = contextvars.ContextVar("current_trace", default=None)
+trace_export_lock = threading.Lock()
+
+class RequestTrace:
+    """Per-stage timings and token counts collected for one chat message"""
+    
+    def __init__(self, message=""):
+        self.message = message[:200]
+        self.started = time.time()
+        self.origin = time.perf_counter()
+        self.spans = []
+        self.tokens = {"input": 0, "output": 0}
+        self.finished = None
+        self.lock = threading.Lock()
+    
+    def add_span(self, name, start, duration, **attrs):
+        with self.lock:
+            self.spans.append({
+                "name": name,
+                "start_ms": round((start - self.origin) * 1000, 1),
+                "duration_ms": round(duration * 1000, 1),
+                **attrs
+            })
+    
+    def add_tokens(self, input_tokens, output_tokens):
+        with self.lock:
+            self.tokens["input"] += input_tokens
+            self.tokens["output"] += output_tokens
+    
+    def merge(self, data):
+        # Spans recorded by the daemon on our behalf
+        for span in data.get("spans", []):
+            with self.lock:
+                self.spans.append(dict(span, remote=True))
+        tokens = data.get("tokens", {})
+        self.add_tokens(tokens.get("input", 0), tokens.get("output", 0))
+    
+    def finish(self):
+        # The reply is on screen; speech that follows must not stretch the total
+        if self.finished is None:
+            self.finished = time.perf_counter()
+    
+    def total_ms(self):
+        return round(((self.finished or time.perf_counter()) - self.origin) * 1000, 1)
+    
+    def summary(self):
+        parts = [f"total {self.total_ms():.0f}ms"]
+        parts += [f"{span['name']} {span['duration_ms']:.0f}ms" for span in self.spans]
+        if self.tokens["input"] or self.tokens["output"]:
+            parts.append(f"{self.tokens['input']}→{self.tokens['output']} tok")
+        return " · ".join(parts)
+    
+    def to_dict(self):
+        return {
+            "timestamp": self.started,
+            "message": self.message,
+            "total_ms": self.total_ms(),
+            "spans": list(self.spans),
+            "tokens": dict(self.tokens),
+        }
+
+def tracing_enabled(config_manager) -> bool:
+    return os.environ.get("FLUX_TRACE") == "1" or bool(config_manager.get("debug.tracing", False))
+
+@contextmanager
+def trace_span(name, **attrs):
+    trace = current_trace.get()
+    if trace is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add_span(name, start, time.perf_counter() - start, **attrs)
+
+def record_usage(message):
+    trace = current_trace.get()
+    usage = getattr(message, "usage_metadata", None)
+    if trace is not None and usage:
+        trace.add_tokens(usage.get("input_tokens", 0), usage.get("output_tokens", 0))
+    return message
+
+def export_trace(trace, trace_file=TRACE_FILE):
     try:
-        temp_dir = Path.home() / ".flux_ai_chat" / "temp_voice"
-        temp_dir.mkdir(parents=True, exist_ok=True)
-        tts = gTTS(text, lang=lang)
+        with trace_export_lock:
+            if trace_file.exists() and trace_file.stat().st_size > TRACE_FILE_MAX_BYTES:
+                trace_file.replace(trace_file.with_suffix(".jsonl.1"))
+            with open(trace_file, 'a') as f:
+                f.write(json.dumps(trace.to_dict(), ensure_ascii=False) + "\n")
+    except OSError as e:
+        logger.error(f"Trace export error: {e}")
+
+# Deadline of the chat message being handled in the current thread/task, if any
+current_deadline = contextvars.ContextVar("current_deadline", default=None)
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+class Deadline:
+    """Absolute time budget for one chat message, shared by every stage that handles it"""
+    
+    def __init__(self, seconds):
+        self.started = time.monotonic()
+        self.expires = self.started + seconds
+    
+    def remaining(self):
+        return max(0.0, self.expires - time.monotonic())
+    
+    def expired(self):
+        return time.monotonic() >= self.expires
+    
+    def set_budget(self, seconds):
+        # Budgets are measured from the start of the request, not from now
+        self.expires = self.started + seconds
+    
+    def narrowed(self, seconds):
+        deadline = Deadline(seconds)
+        deadline.expires = min(deadline.expires, self.expires)
+        return deadline
+
+def stage_timeout(cap=None) -> Optional[float]:
+    """Time the current stage may take: the remaining budget, capped by the stage's own limit"""
+    deadline = current_deadline.get()
+    if deadline is None:
+        return cap
+    if deadline.expired():
+        raise DeadlineExceeded("Request deadline reached")
+    return deadline.remaining() if cap is None else min(cap, deadline.remaining())
+
+def deadline_expired() -> bool:
+    deadline = current_deadline.get()
+    return deadline is not None and deadline.expired()
+
+@contextmanager
+def deadline_scope(seconds):
+    # A tighter limit for one stage, never extending the request's deadline
+    deadline = current_deadline.get()
+    if seconds is None:
+        yield
+        return
+    token = current_deadline.set(deadline.narrowed(seconds) if deadline else Deadline(seconds))
+    try:
+        yield
+    finally:
+        current_deadline.reset(token)
+
+class ProfilingSession:
+    """Collects cProfile stats, tracemalloc growth and event-loop stalls for offline analysis"""
+    
+    def __init__(self):
+        self.active = False
+        self.lock = threading.Lock()
+        # cProfile allows only one active profiler at a time
+        self.busy = threading.Lock()
+        self.stats = {}
+        self.stalls = []
+        self.start_snapshot = None
+        self.started = None
+        self.skipped = {}
+    
+    def start(self):
+        with self.lock:
+            self.stats = {}
+            self.skipped = {}
+            self.stalls = []
+            tracemalloc.start(25)
+            self.start_snapshot = tracemalloc.take_snapshot()
+            self.started = time.time()
+            self.active = True
+        logger.info("Profiling started")
+    
+    def record(self, name, profile):
+        with self.lock:
+            if name in self.stats:
+                self.stats[name].add(profile)
+            else:
+                self.stats[name] = pstats.Stats(profile)
+    
+    def record_skip(self, name):
+        with self.lock:
+            self.skipped[name] = self.skipped.get(name, 0) + 1
+    
+    def record_stall(self, duration_ms):
+        with self.lock:
+            self.stalls.append((time.strftime("%H:%M:%S"), round(duration_ms, 1)))
+    
+    def stop(self, extra=None) -> Path:
+        with self.lock:
+            self.active = False
+            report_dir = PROFILE_DIR / time.strftime("%Y%m%d-%H%M%S")
+            report_dir.mkdir(parents=True, exist_ok=True)
+            
+            for name, stats in self.stats.items():
+                stats.dump_stats(str(report_dir / f"{name}.prof"))
+                with open(report_dir / f"{name}.txt", 'w') as f:
+                    stats.stream = f
+                    stats.sort_stats("cumulative").print_stats(40)
+            
+            snapshot = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+            with open(report_dir / "memory_diff.txt", 'w') as f:
+                for stat in snapshot.compare_to(self.start_snapshot, "lineno")[:40]:
+                    f.write(f"{stat}\n")
+            
+            with open(report_dir / "stalls.txt", 'w') as f:
+                for at, duration_ms in self.stalls:
+                    f.write(f"{at} event loop blocked for {duration_ms}ms\n")
+            
+            summary = {
+                "duration_s": round(time.time() - self.started, 1),
+                "stalls": len(self.stalls),
+                "profiled": sorted(self.stats),
+                # Calls that ran while another profiled call held the profiler
+                "skipped": dict(self.skipped),
+                **(extra or {})
+            }
+            with open(report_dir / "summary.json", 'w') as f:
+                json.dump(summary, f, indent=4)
+        
+        logger.info(f"Profiling report written to {report_dir}")
+        return report_dir
+
+profiler = ProfilingSession()
+
+def profiled(name):
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not profiler.active:
+                return func(*args, **kwargs)
+            if not profiler.busy.acquire(blocking=False):
+                profiler.record_skip(name)
+                return func(*args, **kwargs)
+            profile = cProfile.Profile()
+            try:
+                return profile.runcall(func, *args, **kwargs)
+            finally:
+                profiler.busy.release()
+                profiler.record(name, profile)
+        return wrapper
+    return decorator
+
+def count_live_objects(*types) -> dict:
+    counts = {t.__name__: 0 for t in types}
+    for obj in gc.get_objects():
+        for t in types:
+            if isinstance(obj, t):
+                counts[t.__name__] += 1
+    return counts
+
+@profiled("synthesize_voice")
+def synthesize_voice(text, lang="en") -> Path:
+    temp_dir = Path.home() / ".flux_ai_chat" / "temp_voice"
+    temp_dir.mkdir(parents=True, exist_ok=True)
+    timeout = stage_timeout()
+    with trace_span("tts.synthesize"):
+        tts = gTTS(text, lang=lang, **({"timeout": timeout} if timeout else {}))
         temp_file = temp_dir / "voice.mp3"
         tts.save(str(temp_file))
-        pygame.mixer.init()
-        pygame.mixer.music.load(str(temp_file))
-        pygame.mixer.music.set_volume(min(1.0, max(0.0, volume)))
-        pygame.mixer.music.play()
+    return temp_file
+
+def play_voice(text, volume=0.7, lang="en"):
+    try:
+        # Only time-to-first-audio is traced, not the playback itself
+        with trace_span("tts"):
+            temp_file = synthesize_voice(text, lang)
+            pygame.mixer.init()
+            pygame.mixer.music.load(str(temp_file))
+            pygame.mixer.music.set_volume(min(1.0, max(0.0, volume)))
+            pygame.mixer.music.play()
         while pygame.mixer.music.get_busy():
             time.sleep(0.01)
         pygame.quit()
@@ -114,6 +440,26 @@ def play_voice(text, volume=0.7, lang="en"):
     except Exception as e:
         logger.error(f"Voice error: {e}")
 
+class VoicePlayer:
+    """Single background thread playing queued speech so callers never block on audio"""
+    
+    def __init__(self):
+        self.queue = queue.Queue()
+        threading.Thread(target=self.loop, daemon=True).start()
+    
+    def speak(self, text, volume=0.7, lang="en", trace=None, budget=None):
+        self.queue.put((text, volume, lang, trace, budget))
+    
+    def loop(self):
+        while True:
+            text, volume, lang, trace, budget = self.queue.get()
+            current_trace.set(trace)
+            # The budget bounds speech synthesis, not how long the audio plays
+            current_deadline.set(Deadline(budget) if budget else None)
+            play_voice(text, volume, lang)
+            if trace is not None:
+                export_trace(trace)
+
 class SettingsDialog(QDialog):
     def __init__(self, parent=None, config_manager=None):
         super().__init__(parent)
@@ -345,72 +691,558 @@ class SettingsDialog(QDialog):
         QMessageBox.information(self, "Success", "Settings saved successfully!")
         self.accept()
 
+class CallStats:
+    """Thread-safe named counters for model call bookkeeping"""
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+    
+    def incr(self, name, amount=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+    
+    def get(self, name):
+        with self.lock:
+            return self.counters.get(name, 0)
+    
+    def ratio(self, numerator, denominator):
+        total = self.get(denominator)
+        return self.get(numerator) / total if total else 0.0
+    
+    def snapshot(self):
+        with self.lock:
+            return dict(self.counters)
+
+def create_http_session(pool_size=4) -> requests.Session:
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+shared_session = None
+shared_session_lock = threading.Lock()
+
+def shared_http_session() -> requests.Session:
+    # Keep-alive connections reused by every chat tab and daemon client
+    global shared_session
+    with shared_session_lock:
+        if shared_session is None:
+            shared_session = create_http_session()
+        return shared_session
+
+class OpenAICompatibleChatModel(BaseChatModel):
+    """Chat model for OpenAI-compatible servers (llama.cpp, Ollama, vLLM) over a keep-alive session"""
+    
+    base_url: str
+    model: str
+    api_key: str = ""
+    temperature: float = 0.7
+    max_tokens: int = 2048
+    timeout: float = 60
+    session: Any = None
+    
+    @property
+    def _llm_type(self) -> str:
+        return "openai-compatible"
+    
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        roles = {"system": "system", "human": "user", "ai": "assistant"}
+        payload = {
+            "model": self.model,
+            "messages": [{"role": roles.get(m.type, "user"), "content": m.content} for m in messages],
+            "temperature": self.temperature,
+            "max_tokens": self.max_tokens,
+        }
+        if stop:
+            payload["stop"] = stop
+        headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+        
+        response = self.session.post(
+            f"{self.base_url.rstrip('/')}/chat/completions",
+            json=payload, headers=headers, timeout=kwargs.get("timeout") or self.timeout
+        )
+        response.raise_for_status()
+        data = response.json()
+        
+        usage = data.get("usage") or {}
+        message = AIMessage(
+            content=data["choices"][0]["message"]["content"],
+            usage_metadata={
+                "input_tokens": usage.get("prompt_tokens", 0),
+                "output_tokens": usage.get("completion_tokens", 0),
+                "total_tokens": usage.get("total_tokens", 0),
+            }
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+@profiled("model_call")
+def invoke_chain(chain, inputs):
+    # Profiled where the call actually runs, which under a deadline is its own thread
+    return chain.invoke(inputs)
+
 class GeminiChatBot:
-    def __init__(self, config_manager):
+    def __init__(self, config_manager, model=None):
         self.config_manager = config_manager
-        self.model = None
-        self.initialize_model()
+        # A prebuilt chat model (e.g. a fake one for benchmarks) serves every agent
+        self.model = model
+        self.models = {}
+        # One keep-alive pool per provider, shared by every model tier on that server
+        self.http_sessions = {}
+        self.models_lock = threading.Lock()
+        self.stats = CallStats()
+        self.loop = None
+        self.loop_lock = threading.Lock()
+        # A replaced bot shuts down only after the messages it is handling finish
+        self.active_requests = 0
+        self.closing = False
+        self.requests_lock = threading.Lock()
+        self.max_concurrency = max(1, int(self.config_manager.get("advanced.max_concurrency", 4)))
+        # asyncio semaphores are bound to the loop they are first used on
+        self.semaphores = weakref.WeakKeyDictionary()
+        if self.model is None:
+            self.initialize_model()
     
     def initialize_model(self):
-        api_key = self.config_manager.get("api_keys.gemini")
+        # Build every fast-tier model the agents use up front so the first message is warm
+        for agent in ["agent_selector"] + AGENT_TYPES:
+            self.get_model(agent)
+    
+    def profile_for(self, agent: Optional[str], escalated: bool = False) -> dict:
+        profile = dict(self.config_manager.get(f"agents.{agent}", {}) if agent else {})
+        escalation = profile.pop("escalate", None)
+        if escalated and escalation:
+            # A Gemini model name only makes sense on the Gemini provider
+            if "provider" not in escalation and str(escalation.get("model", "")).startswith("gemini"):
+                escalation = {**escalation, "provider": "gemini"}
+            profile.update(escalation)
+        provider_type = self.config_manager.get(f"providers.{profile.get('provider', 'gemini')}.type", "gemini")
+        if provider_type != "gemini" and str(profile.get("model", "")).startswith("gemini"):
+            # Default profiles name Gemini models; other servers use their own model setting
+            profile.pop("model")
+        return profile
+    
+    def provider_for(self, agent: Optional[str], escalated: bool = False) -> str:
+        return self.profile_for(agent, escalated).get("provider", "gemini")
+    
+    def can_escalate(self, agent: str) -> bool:
+        return self.model is None and bool(self.config_manager.get(f"agents.{agent}.escalate"))
+    
+    def record_escalation(self, agent: str, reason: str):
+        self.stats.incr(f"escalations.{agent}")
+        self.stats.incr(f"escalations.{agent}.{reason}")
+        logger.info(
+            f"Escalating {agent} ({reason}), escalation rate "
+            f"{self.stats.ratio(f'escalations.{agent}', f'requests.{agent}'):.0%}"
+        )
+    
+    def get_model(self, agent: Optional[str] = None, escalated: bool = False):
+        if self.model is not None:
+            return self.model
+        
+        profile = self.profile_for(agent, escalated)
+        key = (profile.get("provider", "gemini"), profile.get("model"), profile.get("max_tokens"))
+        with self.models_lock:
+            if key not in self.models:
+                self.models[key] = self.create_model(*key)
+            return self.models[key]
+    
+    def create_model(self, name: str, model_name: Optional[str] = None, max_tokens: Optional[int] = None):
+        provider = self.config_manager.get(f"providers.{name}", {"type": "gemini"} if name == "gemini" else None)
+        if not provider:
+            raise ValueError(f"LLM provider '{name}' not configured")
+        
+        temperature = provider.get("temperature", self.config_manager.get("advanced.temperature", 0.7))
+        max_tokens = max_tokens or provider.get("max_tokens", self.config_manager.get("advanced.max_tokens", 2048))
+        
+        if provider.get("type") == "openai":
+            # Called with models_lock held
+            if name not in self.http_sessions:
+                self.http_sessions[name] = create_http_session(provider.get("pool_size", 4))
+            return OpenAICompatibleChatModel(
+                base_url=provider["base_url"],
+                model=model_name or provider.get("model", "local"),
+                api_key=provider.get("api_key", ""),
+                temperature=temperature,
+                max_tokens=max_tokens,
+                timeout=provider.get("timeout", 60),
+                session=self.http_sessions[name]
+            )
+        
+        api_key = provider.get("api_key") or self.config_manager.get("api_keys.gemini")
         if not api_key:
             raise ValueError("Gemini API key not configured")
         
-        os.environ["GOOGLE_API_KEY"] = api_key
-        
         try:
-            self.model = ChatGoogleGenerativeAI(
-                model=self.config_manager.get("advanced.model", "gemini-2.5-flash"),
-                temperature=self.config_manager.get("advanced.temperature", 0.7),
-                max_tokens=self.config_manager.get("advanced.max_tokens", 2048)
+            return ChatGoogleGenerativeAI(
+                model=model_name or provider.get("model", self.config_manager.get("advanced.model", "gemini-2.5-flash")),
+                temperature=temperature,
+                max_tokens=max_tokens,
+                timeout=provider.get("timeout", 60),
+                max_retries=provider.get("max_retries", 1),
+                google_api_key=api_key
             )
         except Exception as e:
             logger.error(f"Failed to initialize Gemini: {e}")
             raise
     
-    def process_request(self, user_input: str, system_prompt: str) -> Optional[str]:
+    def build_chain(self, system_prompt: str, agent: Optional[str] = None, escalated: bool = False,
+                    timeout: Optional[float] = None):
+        prompt_template = ChatPromptTemplate.from_messages([
+            ("system", system_prompt),
+            ("user", "{user_input}")
+        ])
+        model = self.get_model(agent, escalated)
+        if timeout and isinstance(model, (OpenAICompatibleChatModel, ChatGoogleGenerativeAI)):
+            # The client itself gives up when the budget runs out, so abandoned calls end too
+            model = model.bind(timeout=timeout)
+        return prompt_template | model | RunnableLambda(record_usage) | StrOutputParser()
+    
+    def run_async(self, coro):
+        # One long-lived loop keeps async model clients bound to a single loop
+        with self.loop_lock:
+            if self.loop is None:
+                self.loop = asyncio.new_event_loop()
+                threading.Thread(target=self.run_loop, args=(self.loop,), daemon=True).start()
+        return asyncio.run_coroutine_threadsafe(
+            self.with_context(coro, current_trace.get(), current_deadline.get()), self.loop
+        ).result()
+    
+    @staticmethod
+    def run_loop(loop):
+        loop.run_forever()
+        loop.close()
+    
+    @staticmethod
+    async def stop_loop():
+        # Cancel leftover tasks so nothing blocked in run_async hangs
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        asyncio.get_running_loop().stop()
+    
+    @contextmanager
+    def request_scope(self):
+        with self.requests_lock:
+            self.active_requests += 1
+        try:
+            yield
+        finally:
+            with self.requests_lock:
+                self.active_requests -= 1
+                drained = self.closing and self.active_requests == 0
+            if drained:
+                self.shutdown()
+    
+    def close(self):
+        """Stop the event loop thread once in-flight messages finish; call before replacing the bot"""
+        with self.requests_lock:
+            self.closing = True
+            drained = self.active_requests == 0
+        if drained:
+            self.shutdown()
+    
+    def shutdown(self):
+        with self.loop_lock:
+            loop, self.loop = self.loop, None
+        if loop is not None:
+            asyncio.run_coroutine_threadsafe(self.stop_loop(), loop)
+    
+    @staticmethod
+    async def with_context(coro, trace, deadline):
+        # Tasks on the loop thread do not inherit the caller's context
+        current_trace.set(trace)
+        current_deadline.set(deadline)
+        return await coro
+    
+    def get_semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if loop not in self.semaphores:
+            self.semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+        return self.semaphores[loop]
+    
+    def process_request(self, user_input: str, system_prompt: str, agent: Optional[str] = None,
+                        escalated: bool = False) -> Optional[str]:
         try:
-            prompt_template = ChatPromptTemplate.from_messages([
-                ("system", system_prompt),
-                ("user", "{user_input}")
-            ])
-            chain = prompt_template | self.model | StrOutputParser()
-            result = chain.invoke({"user_input": user_input})
-            return result
+            tier = "escalated" if escalated else "fast"
+            with trace_span("model", agent=agent, provider=self.provider_for(agent, escalated), tier=tier):
+                timeout = stage_timeout()
+                chain = self.build_chain(system_prompt, agent, escalated, timeout)
+                if timeout is None:
+                    return invoke_chain(chain, {"user_input": user_input})
+                
+                future = self.start_call(invoke_chain, chain, {"user_input": user_input})
+                try:
+                    return future.result(timeout=timeout)
+                except FutureTimeout:
+                    # The abandoned call ends at the client timeout; its result is dropped
+                    raise DeadlineExceeded(f"{agent or 'Model'} call exceeded its deadline")
         except Exception as e:
             logger.error(f"Error: {e}")
             return None
+    
+    @staticmethod
+    def start_call(func, *args) -> Future:
+        # One thread per call: a shared pool would queue new calls behind abandoned
+        # ones, spending deadlines on calls that never started
+        future = Future()
+        
+        def call():
+            try:
+                future.set_result(func(*args))
+            except Exception as e:
+                future.set_exception(e)
+        
+        threading.Thread(target=contextvars.copy_context().run, args=(call,), daemon=True).start()
+        return future
+    
+    async def aprocess_request(self, user_input: str, system_prompt: str, agent: Optional[str] = None,
+                               escalated: bool = False) -> Optional[str]:
+        async with self.get_semaphore():
+            try:
+                tier = "escalated" if escalated else "fast"
+                with trace_span("model.async", agent=agent, provider=self.provider_for(agent, escalated), tier=tier):
+                    timeout = stage_timeout()
+                    chain = self.build_chain(system_prompt, agent, escalated, timeout)
+                    return await asyncio.wait_for(chain.ainvoke({"user_input": user_input}), timeout)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error: {e}")
+                return None
+    
+    def batch_requests(self, user_inputs: List[str], system_prompt: str,
+                       agent: Optional[str] = None) -> List[Optional[str]]:
+        return self.run_async(self.abatch_requests(user_inputs, system_prompt, agent))
+    
+    async def abatch_requests(self, user_inputs: List[str], system_prompt: str,
+                              agent: Optional[str] = None) -> List[Optional[str]]:
+        # Item by item through aprocess_request, so batches share the bot-wide concurrency
+        # limit with single requests and get the same deadline and tracing
+        return list(await asyncio.gather(
+            *(self.aprocess_request(text, system_prompt, agent) for text in user_inputs)
+        ))
 
 class ChatWorker(QThread):
     finished = pyqtSignal(tuple)
     error = pyqtSignal(str)
+    step_finished = pyqtSignal(dict)
     
-    def __init__(self, chat_bot, agent_type, user_input, config_manager):
+    def __init__(self, chat_bot, user_input, config_manager, lang=None, daemon_client=None, trace=None):
         super().__init__()
         self.chat_bot = chat_bot
-        self.agent_type = agent_type
         self.user_input = user_input
         self.config_manager = config_manager
+        self.lang = lang
+        self.daemon_client = daemon_client
+        self.trace = trace
+        self.streamed_steps = 0
+    
+    def emit_step(self, step, output):
+        self.streamed_steps += 1
+        self.step_finished.emit({"id": step["id"], "command": step["command"], "output": output})
     
     def run(self):
+        current_trace.set(self.trace)
         try:
-            if self.agent_type == "linux_command":
-                result = linux_command(self.user_input, self.chat_bot)
-            elif self.agent_type == "weather_gether":
-                result = weather_gether(self.user_input, self.chat_bot, self.config_manager)
-            elif self.agent_type == "tech_chat":
-                result = tech_chat(self.user_input, self.chat_bot)
-            self.finished.emit((self.agent_type, result))
+            if self.daemon_client:
+                result = self.daemon_client.chat(self.user_input, self.lang, self.trace, self.emit_step)
+            else:
+                result = handle_message(
+                    self.user_input, self.chat_bot, self.config_manager, self.lang, self.emit_step
+                )
+            self.finished.emit(result)
         except Exception as e:
             self.error.emit(str(e))
 
-def linux_command(user_input: str, chat_bot) -> Tuple[str, str, str]:
+class CommandWorker(ChatWorker):
+    """Re-runs a known command without asking the model"""
+    
+    def __init__(self, command, description):
+        super().__init__(None, command, None)
+        self.description = description
+    
+    def run(self):
+        try:
+            self.finished.emit(("linux_command", (self.user_input, self.description, execute_command(self.user_input))))
+        except Exception as e:
+            self.error.emit(str(e))
+
+DANGEROUS_COMMANDS = ['rm -rf /', 'dd if=/dev/zero', ':(){ :|:& };:', 'mkfs.']
+
+# Diagnostics that only read state; plan steps made of these may run concurrently
+READ_ONLY_COMMANDS = {
+    'cat', 'date', 'df', 'dmesg', 'du', 'echo', 'env', 'free', 'grep', 'head', 'hostname', 'id',
+    'iostat', 'ip', 'journalctl', 'lsblk', 'lscpu', 'ls', 'lsof', 'lspci', 'lsusb', 'mount', 'netstat',
+    'nproc', 'ps', 'pwd', 'sensors', 'sort', 'ss', 'stat', 'tail', 'uname', 'uniq', 'uptime', 'vmstat',
+    'wc', 'which', 'whoami'
+}
+
+def is_read_only(linux_command: str) -> bool:
+    # Redirection, command substitution and sequencing can hide writes in any command
+    if re.search(r"[>;&`]|\$\(", linux_command):
+        return False
+    return all(
+        segment.split() and segment.split()[0] in READ_ONLY_COMMANDS
+        for segment in linux_command.split("|")
+    )
+
+def parse_command_plan(response: str) -> Tuple[str, List[dict]]:
+    """Parse either a single <command> or a <plan> of <step> elements with dependencies"""
+    cleaned_data = re.sub(r'```', '', response)
+    root = ET.fromstring(cleaned_data)
+    description = root.findtext('description', '')
+    
+    if root.tag != 'plan':
+        command = (root.findtext('linux') or '').strip()
+        if not command:
+            raise ValueError("Command is empty")
+        return description, [{"id": "1", "command": command, "depends": []}]
+    
+    elements = root.findall('step')
+    if not elements:
+        raise ValueError("Plan has no steps")
+    
+    # Steps are keyed by id while running, so a repeated id would drop a step
+    explicit = [step.get('id') for step in elements if step.get('id')]
+    duplicates = sorted({step_id for step_id in explicit if explicit.count(step_id) > 1})
+    if duplicates:
+        raise ValueError(f"Plan has duplicate step ids: {', '.join(duplicates)}")
+    
+    used = set(explicit)
+    steps = []
+    for index, step in enumerate(elements, 1):
+        step_id = step.get('id')
+        if not step_id:
+            step_id = str(index)
+            while step_id in used:
+                step_id = f"step{index}" if step_id == str(index) else f"{step_id}_"
+            used.add(step_id)
+        command = (step.findtext('linux') or '').strip()
+        if not command:
+            # An empty shell command "succeeds" and would let its dependents run
+            raise ValueError(f"Plan step {step_id} has no command")
+        steps.append({
+            "id": step_id,
+            "command": command,
+            "depends": (step.get('depends') or "").replace(",", " ").split(),
+        })
+    
+    known = {step["id"] for step in steps}
+    for step in steps:
+        step["depends"] = [dep for dep in step["depends"] if dep in known and dep != step["id"]]
+    return description, steps
+
+def execute_command(linux_command: str, cwd: Optional[str] = None) -> str:
+    if any(cmd in linux_command for cmd in DANGEROUS_COMMANDS):
+        return "⚠️ DANGEROUS COMMAND - Not executed"
+    
+    try:
+        timeout = stage_timeout(10)
+    except DeadlineExceeded:
+        return "⏱️ Skipped: request deadline reached"
+    
+    try:
+        terminal_output = sub.check_output(
+            linux_command, shell=True, text=True, 
+            timeout=timeout, stderr=sub.STDOUT, cwd=cwd
+        )
+        return f"✅ Output:\n{terminal_output.strip()}"
+    except sub.TimeoutExpired:
+        return "⏱️ Command timed out"
+    except Exception as e:
+        return f"❌ Error: {str(e)}"
+
+def execute_plan(steps: List[dict], on_step=None, max_workers=4, cwd: Optional[str] = None) -> List[Tuple[dict, str]]:
+    """Run plan steps as soon as their dependencies succeed, independent read-only ones in parallel"""
+    outputs = {}
+    pending = {step["id"]: step for step in steps}
+    running = {}
+    
+    # A step that may change state waits for every earlier step, and every later step waits for it
+    depends = {}
+    barrier = None
+    for index, step in enumerate(steps):
+        depends[step["id"]] = set(step["depends"])
+        if not is_read_only(step["command"]):
+            depends[step["id"]].update(earlier["id"] for earlier in steps[:index])
+            barrier = step["id"]
+        elif barrier:
+            depends[step["id"]].add(barrier)
+    
+    def run_step(step):
+        with trace_span("command_exec", step=step["id"]):
+            return execute_command(step["command"], cwd)
+    
+    def finish(step, output):
+        outputs[step["id"]] = output
+        if on_step:
+            on_step(step, output)
+    
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        while pending or running:
+            for step_id, step in list(pending.items()):
+                if any(dep in outputs and not outputs[dep].startswith("✅") for dep in depends[step_id]):
+                    del pending[step_id]
+                    finish(step, "⏭️ Skipped: a step it depends on did not succeed")
+                elif all(dep in outputs for dep in depends[step_id]):
+                    del pending[step_id]
+                    # Pool threads do not inherit the caller's trace context
+                    running[pool.submit(contextvars.copy_context().run, run_step, step)] = step
+            
+            if not running:
+                # Whatever is left waits on a dependency cycle
+                for step in pending.values():
+                    finish(step, "⏭️ Skipped: circular dependency")
+                break
+            
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                finish(running.pop(future), future.result())
+    
+    return [(step, outputs[step["id"]]) for step in steps]
+
+COMPLEX_HINTS = ("script", "why", "debug", "diagnose", "troubleshoot", "optimize", "automate", "pipeline", "and then")
+# Whole words only, so "subscription" or "description" do not count as "script"
+COMPLEX_PATTERN = re.compile(r"\b(" + "|".join(re.escape(hint) for hint in COMPLEX_HINTS) + r")\b")
+
+def is_complex_request(user_input: str, word_limit: int = 25) -> bool:
+    text = user_input.lower()
+    return len(text.split()) > word_limit or COMPLEX_PATTERN.search(text) is not None
+
+def request_with_escalation(chat_bot, agent: str, user_input: str, system_prompt: str, parse,
+                            response: Optional[str] = None, complex_request: bool = False):
+    """Ask the fast tier and parse its reply, retrying once on the escalated tier if parsing fails"""
+    chat_bot.stats.incr(f"requests.{agent}")
+    escalated = complex_request and chat_bot.can_escalate(agent)
+    if escalated:
+        chat_bot.record_escalation(agent, "complexity")
+        response = None
+    if response is None:
+        response = chat_bot.process_request(user_input, system_prompt, agent, escalated)
+    
+    try:
+        with trace_span("xml_parse"):
+            return parse(response)
+    except Exception as e:
+        if escalated or not chat_bot.can_escalate(agent) or deadline_expired():
+            raise
+        logger.warning(f"Fast tier reply for {agent} did not parse: {e}")
+    
+    chat_bot.record_escalation(agent, "parse_failure")
+    response = chat_bot.process_request(user_input, system_prompt, agent, escalated=True)
+    with trace_span("xml_parse"):
+        return parse(response)
+
+def linux_command_prompt(lang: Optional[str] = None) -> str:
     system_info = detect_system_info()
     
-    system_prompt = f"""
+    return f"""
     You are a professional Linux system administrator with expertise and humor.
     System: {system_info}
-    Response Language: {language}
+    Response Language: {lang or language}
     
     Provide Linux commands in this XML format:
     <command>
@@ -418,64 +1250,75 @@ def linux_command(user_input: str, chat_bot) -> Tuple[str, str, str]:
         <description>Professional explanation with humor when appropriate</description>
     </command>
     
+    When a diagnosis needs several commands, return a plan instead. Read-only
+    diagnostic steps without "depends" run in parallel; declare a dependency when
+    a step needs another one to finish first. Steps that change anything run in
+    the order they are listed, after all steps before them:
+    <plan>
+        <description>Professional explanation with humor when appropriate</description>
+        <step id="mem"><linux>free -h</linux></step>
+        <step id="disk"><linux>df -h</linux></step>
+        <step id="top" depends="mem"><linux>ps aux --sort=-%mem | head</linux></step>
+    </plan>
+    
     Be accurate, add subtle humor (xkcd style), warn about dangerous commands.
     """
-    
-    response = chat_bot.process_request(user_input, system_prompt)
-    if not response:
-        raise ValueError("No response")
+
+def linux_command(user_input: str, chat_bot, lang: Optional[str] = None, response: Optional[str] = None,
+                  on_step=None, max_workers=4, word_limit=25, cwd: Optional[str] = None) -> Tuple[str, str, str]:
+    def parse(reply):
+        if not reply and deadline_expired():
+            raise DeadlineExceeded("No command within the time budget")
+        if not reply:
+            raise ValueError("No response")
+        return parse_command_plan(reply)
     
     try:
-        cleaned_data = re.sub(r'```', '', response)
-        root = ET.fromstring(cleaned_data)
-        linux_command = root.find('linux').text
-        description = root.find('description').text
-        
-        dangerous_commands = ['rm -rf /', 'dd if=/dev/zero', ':(){ :|:& };:', 'mkfs.']
-        is_dangerous = any(cmd in linux_command for cmd in dangerous_commands)
-        
-        if is_dangerous:
-            terminal_output = "⚠️ DANGEROUS COMMAND - Not executed"
-        else:
-            try:
-                terminal_output = sub.check_output(
-                    linux_command, shell=True, text=True, 
-                    timeout=10, stderr=sub.STDOUT
-                )
-                terminal_output = f"✅ Output:\n{terminal_output.strip()}"
-            except sub.TimeoutExpired:
-                terminal_output = "⏱️ Command timed out"
-            except Exception as e:
-                terminal_output = f"❌ Error: {str(e)}"
+        description, steps = request_with_escalation(
+            chat_bot, "linux_command", user_input, linux_command_prompt(lang), parse,
+            response, is_complex_request(user_input, word_limit)
+        )
+        if len(steps) == 1:
+            with trace_span("command_exec"):
+                return steps[0]["command"], description, execute_command(steps[0]["command"], cwd)
         
-        return linux_command, description, terminal_output
+        with trace_span("plan_exec", steps=len(steps)):
+            results = execute_plan(steps, on_step, max_workers, cwd)
+        commands = "\n".join(step["command"] for step in steps)
+        output = "\n\n".join(f"$ {step['command']}\n{output}" for step, output in results)
+        return commands, description, output
     except Exception as e:
         logger.error(f"Command error: {e}")
         raise
 
-def weather_gether(user_input: str, chat_bot, config_manager) -> str:
+WEATHER_API_URL = "https://api.weatherapi.com/v1/forecast.json"
+
+WEATHER_PROMPT = """Extract city name. Return XML:
+    <weather_request><city>CityName</city></weather_request>
+    Or: <weather_request><e>No city</e></weather_request>"""
+
+def weather_gether(user_input: str, chat_bot, config_manager, response: Optional[str] = None) -> str:
     weather_api = config_manager.get("api_keys.weather")
     if not weather_api:
         return "Weather API key not configured"
     
-    system_prompt = """Extract city name. Return XML:
-    <weather_request><city>CityName</city></weather_request>
-    Or: <weather_request><e>No city</e></weather_request>"""
-    
-    response = chat_bot.process_request(user_input, system_prompt)
-    if not response:
-        return "Failed to process"
+    def parse(reply):
+        if not reply:
+            raise ValueError("Failed to process")
+        root = ET.fromstring(re.sub(r'```', '', reply))
+        if root.find('e') is not None or root.find('error') is not None:
+            return None
+        return root.find('city').text
     
     try:
-        root = ET.fromstring(response)
-        if root.find('error') is not None:
+        location = request_with_escalation(chat_bot, "weather_gether", user_input, WEATHER_PROMPT, parse, response)
+        if not location:
             return "Please specify a city"
         
-        location = root.find('city').text
-        url = "https://api.weatherapi.com/v1/forecast.json"
-        response = requests.get(url, params={
-            "key": weather_api, "q": location, "days": 3
-        }, timeout=10)
+        with trace_span("weather_fetch"):
+            response = shared_http_session().get(WEATHER_API_URL, params={
+                "key": weather_api, "q": location, "days": 3
+            }, timeout=stage_timeout(10))
         response.raise_for_status()
         
         data = response.json()
@@ -492,40 +1335,772 @@ def weather_gether(user_input: str, chat_bot, config_manager) -> str:
     except Exception as e:
         return f"Error: {str(e)}"
 
-def tech_chat(user_input: str, chat_bot) -> str:
-    system_prompt = f"""
+def tech_chat_prompt(lang: Optional[str] = None) -> str:
+    return f"""
     You are a senior Linux engineer with expertise and dry humor.
-    Response Language: {language}
+    Response Language: {lang or language}
     Be direct, technical but approachable. Keep responses 2-4 sentences.
     Add subtle humor when appropriate. "There is no cloud, it's just someone else's computer."
     """
-    
-    response = chat_bot.process_request(user_input, system_prompt)
+
+def tech_chat(user_input: str, chat_bot, lang: Optional[str] = None, response: Optional[str] = None) -> str:
+    if response is None:
+        response = chat_bot.process_request(user_input, tech_chat_prompt(lang), "tech_chat")
+    if not response and deadline_expired():
+        return "⏱️ No answer within the time budget. Try again?"
     return response if response else "AI hamsters stopped running. Try again?"
 
-def agent_selector(chat_bot, user_input: str) -> str:
-    system_prompt = """
+AGENT_SELECTOR_PROMPT = """
     Classify and return ONLY one:
     'linux_command': Linux/Unix commands
     'weather_gether': Weather info
     'tech_chat': General tech/chat
     """
-    
-    response = chat_bot.process_request(user_input, system_prompt)
+
+WEATHER_HINTS = ("weather", "forecast", "rain", "snow", "hava", "wetter", "clima", "tiempo", "météo", "погода")
+COMMAND_HINTS = ("command", "how do i", "how to", "list", "show", "find", "check", "disk", "process",
+                 "install", "kill", "port", "memory", "cpu", "usage", "komut", "$ ")
+
+def parse_agent(response: Optional[str]) -> str:
     if not response:
         return "tech_chat"
     
-    agent = response.strip().lower()
-    return agent if agent in ['linux_command', 'weather_gether', 'tech_chat'] else "tech_chat"
+    agent = response.strip().strip("'\"").lower()
+    return agent if agent in AGENT_TYPES else "tech_chat"
+
+def agent_selector(chat_bot, user_input: str) -> str:
+    with trace_span("agent_selector"):
+        return parse_agent(chat_bot.process_request(user_input, AGENT_SELECTOR_PROMPT, "agent_selector"))
+
+def guess_agent(user_input: str) -> str:
+    """Cheap local guess of the routing result, used to pick the speculative agent"""
+    text = user_input.lower()
+    if any(hint in text for hint in WEATHER_HINTS):
+        return "weather_gether"
+    if any(hint in text for hint in COMMAND_HINTS):
+        return "linux_command"
+    return "tech_chat"
+
+def agent_prompt(agent_type: str, lang: Optional[str] = None) -> str:
+    if agent_type == "linux_command":
+        return linux_command_prompt(lang)
+    elif agent_type == "weather_gether":
+        return WEATHER_PROMPT
+    return tech_chat_prompt(lang)
+
+def run_agent(agent_type: str, user_input: str, chat_bot, config_manager,
+              lang: Optional[str] = None, response: Optional[str] = None, on_step=None, cwd: Optional[str] = None):
+    if agent_type == "linux_command":
+        return linux_command(
+            user_input, chat_bot, lang, response, on_step,
+            config_manager.get("advanced.max_parallel_commands", 4),
+            config_manager.get("advanced.escalation_word_limit", 25),
+            cwd
+        )
+    elif agent_type == "weather_gether":
+        return weather_gether(user_input, chat_bot, config_manager, response)
+    return tech_chat(user_input, chat_bot, lang, response)
+
+async def speculative_route(user_input: str, chat_bot, config_manager,
+                            lang: Optional[str] = None) -> Tuple[str, Optional[str]]:
+    """Route while the likely agent's model call is already in flight.
+    
+    Only the model call is speculated; command execution and HTTP fetches
+    run after routing confirms the agent.
+    """
+    guess = config_manager.get("advanced.speculative_agent", "tech_chat")
+    if guess == "auto":
+        guess = guess_agent(user_input)
+    if guess not in AGENT_TYPES:
+        guess = "tech_chat"
+    
+    stats = chat_bot.stats
+    word_limit = config_manager.get("advanced.escalation_word_limit", 25)
+    if guess == "linux_command" and chat_bot.can_escalate(guess) and is_complex_request(user_input, word_limit):
+        # The agent would discard a fast-tier reply and ask the escalated tier anyway
+        stats.incr("speculation.skipped")
+        with deadline_scope(config_manager.get("deadlines.agent_selector")):
+            agent_type = parse_agent(await chat_bot.aprocess_request(user_input, AGENT_SELECTOR_PROMPT, "agent_selector"))
+        return agent_type, None
+    
+    speculative = asyncio.ensure_future(chat_bot.aprocess_request(user_input, agent_prompt(guess, lang), guess))
+    with deadline_scope(config_manager.get("deadlines.agent_selector")):
+        agent_type = parse_agent(await chat_bot.aprocess_request(user_input, AGENT_SELECTOR_PROMPT, "agent_selector"))
+    stats.incr("speculation.calls")
+    
+    if agent_type == guess:
+        stats.incr("speculation.hits")
+        response = await speculative
+    else:
+        stats.incr("speculation.misses")
+        # A call that already finished was paid for; a cancelled one may not have been
+        stats.incr("speculation.wasted" if speculative.done() else "speculation.cancelled")
+        speculative.cancel()
+        try:
+            await speculative
+        except asyncio.CancelledError:
+            pass
+        response = None
+    
+    logger.info(
+        f"Speculation {'hit' if agent_type == guess else 'miss'} ({guess} -> {agent_type}), "
+        f"hit rate {stats.ratio('speculation.hits', 'speculation.calls'):.0%}, "
+        f"wasted {stats.get('speculation.wasted')}"
+    )
+    return agent_type, response
+
+def handle_message(user_input: str, chat_bot, config_manager, lang: Optional[str] = None, on_step=None,
+                   cwd: Optional[str] = None) -> tuple:
+    deadlines = config_manager.get("deadlines", {}) or {}
+    deadline = Deadline(deadlines.get("default", 30))
+    token = current_deadline.set(deadline)
+    try:
+        with chat_bot.request_scope():
+            if config_manager.get("advanced.speculation", False):
+                with trace_span("speculative_route"):
+                    agent_type, response = chat_bot.run_async(
+                        speculative_route(user_input, chat_bot, config_manager, lang)
+                    )
+            else:
+                with deadline_scope(deadlines.get("agent_selector")):
+                    agent_type, response = agent_selector(chat_bot, user_input), None
+            
+            deadline.set_budget(deadlines.get(agent_type, deadlines.get("default", 30)))
+            with trace_span(agent_type):
+                return agent_type, run_agent(agent_type, user_input, chat_bot, config_manager, lang, response, on_step, cwd)
+    finally:
+        current_deadline.reset(token)
+
+class DaemonRequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        self.write_lock = threading.Lock()
+        try:
+            request = json.loads(self.rfile.readline())
+            reply = self.server.dispatch(request, self.send)
+        except Exception as e:
+            logger.error(f"Daemon error: {e}")
+            reply = {"ok": False, "error": str(e)}
+        self.send(reply)
+    
+    def send(self, payload):
+        # Plan steps finish on executor threads while the request is still open
+        with self.write_lock:
+            self.wfile.write((json.dumps(payload) + "\n").encode())
+            self.wfile.flush()
+
+class FluxDaemon(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Hosts one warm chat bot and audio worker for GUI and CLI clients"""
+    
+    daemon_threads = True
+    
+    def __init__(self, config_manager, socket_path=DAEMON_SOCKET):
+        self.config_manager = config_manager
+        self.socket_path = Path(socket_path)
+        
+        if self.socket_path.exists():
+            if DaemonClient(self.socket_path).is_alive():
+                raise RuntimeError(f"Daemon already running on {self.socket_path}")
+            self.socket_path.unlink()
+        
+        # The socket runs shell commands, so it must never exist with wider permissions
+        self.socket_path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+        old_umask = os.umask(0o177)
+        try:
+            super().__init__(str(self.socket_path), DaemonRequestHandler)
+        finally:
+            os.umask(old_umask)
+        
+        try:
+            self.chat_bot = GeminiChatBot(config_manager)
+        except Exception:
+            self.server_close()
+            raise
+        self.voice_player = VoicePlayer()
+    
+    def dispatch(self, request, send):
+        op = request.get("op")
+        if op == "ping":
+            return {"ok": True, "pid": os.getpid()}
+        if op == "chat":
+            trace = RequestTrace(request["message"]) if request.get("trace") else None
+            current_trace.set(trace)
+            # Commands run where the client was started, not where the daemon was
+            agent_type, result = handle_message(
+                request["message"], self.chat_bot, self.config_manager, request.get("language"),
+                lambda step, output: send({"event": "step", "step": {**step, "output": output}}),
+                request.get("cwd")
+            )
+            reply = {"ok": True, "agent": agent_type, "result": result}
+            if trace:
+                reply["trace"] = trace.to_dict()
+            return reply
+        if op == "speak":
+            self.voice_player.speak(
+                request["text"], request.get("volume", 0.7), request.get("lang", "en"),
+                budget=self.config_manager.get("deadlines.tts")
+            )
+            return {"ok": True}
+        if op == "stats":
+            return {"ok": True, "stats": self.chat_bot.stats.snapshot()}
+        if op == "reload":
+            self.config_manager.load_config()
+            chat_bot, self.chat_bot = self.chat_bot, GeminiChatBot(self.config_manager)
+            chat_bot.close()
+            return {"ok": True}
+        return {"ok": False, "error": f"Unknown op: {op}"}
+    
+    def server_close(self):
+        super().server_close()
+        self.socket_path.unlink(missing_ok=True)
+
+class DaemonClient:
+    """Thin client talking to a running FluxDaemon over its Unix socket"""
+    
+    def __init__(self, socket_path=DAEMON_SOCKET, timeout=120):
+        self.socket_path = Path(socket_path)
+        self.timeout = timeout
+    
+    def request(self, payload, on_event=None):
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+            conn.settimeout(self.timeout)
+            conn.connect(str(self.socket_path))
+            conn.sendall((json.dumps(payload) + "\n").encode())
+            stream = conn.makefile("rb")
+            reply = json.loads(stream.readline())
+            # Progress events precede the final reply on the same connection
+            while "event" in reply:
+                if on_event:
+                    on_event(reply)
+                reply = json.loads(stream.readline())
+        if not reply.get("ok"):
+            raise RuntimeError(reply.get("error", "Daemon request failed"))
+        return reply
+    
+    def is_alive(self):
+        if not self.socket_path.exists():
+            return False
+        try:
+            self.request({"op": "ping"})
+            return True
+        except (OSError, ValueError, RuntimeError):
+            return False
+    
+    def chat(self, message, lang=None, trace=None, on_step=None):
+        def on_event(event):
+            if on_step and event["event"] == "step":
+                step = event["step"]
+                on_step(step, step.pop("output"))
+        
+        reply = self.request({
+            "op": "chat", "message": message, "language": lang, "trace": trace is not None, "cwd": os.getcwd()
+        }, on_event)
+        if trace is not None and "trace" in reply:
+            trace.merge(reply["trace"])
+        result = reply["result"]
+        # JSON turns the linux_command tuple into a list
+        return reply["agent"], tuple(result) if isinstance(result, list) else result
+    
+    def speak(self, text, volume=0.7, lang="en"):
+        self.request({"op": "speak", "text": text, "volume": volume, "lang": lang})
+    
+    def reload(self):
+        self.request({"op": "reload"})
+
+def render_user_message(message: str, timestamp: str) -> str:
+    return f"""
+        <div style='text-align: right; margin: 10px 0;'>
+            <span style='color: #666; font-size: 12px;'>{timestamp}</span><br>
+            <span style='background: #1a1a1a; color: white; padding: 10px; 
+                  border-radius: 10px; border-left: 3px solid #00c853;'>
+                {message}
+            </span>
+        </div>
+    """
+
+def render_step(step: dict) -> str:
+    return f"""
+        <div style='margin: 5px 0 5px 20px;'>
+            <code style='color: #00c853;'>$ {step['command']}</code>
+            <pre style='color: #0f0; background: #0f0f0f; padding: 8px; 
+                 border-radius: 5px;'>{step['output']}</pre>
+        </div>
+    """
+
+def render_response(agent_type: str, response, timestamp: str, streamed: bool = False) -> str:
+    if agent_type == "linux_command" and streamed:
+        # Step outputs were already shown as they finished
+        cmd, desc, output = response
+        return f"""
+            <div style='margin: 10px 0;'>
+                <span style='color: #00c853; font-weight: bold;'>🤖 Flux AI</span>
+                <span style='color: #666; font-size: 12px;'> {timestamp}</span><br>
+                <div style='background: #1a1a1a; padding: 15px; border-radius: 10px; 
+                     border-left: 3px solid #00c853; margin-top: 5px;'>
+                    <b style='color: #00c853;'>Commands:</b><br>
+                    <code style='color: #0f0;'>{cmd.replace(chr(10), '<br>')}</code><br><br>
+                    <b style='color: #00c853;'>Description:</b> {desc}
+                </div>
+            </div>
+        """
+    if agent_type == "linux_command":
+        cmd, desc, output = response
+        return f"""
+            <div style='margin: 10px 0;'>
+                <span style='color: #00c853; font-weight: bold;'>🤖 Flux AI</span>
+                <span style='color: #666; font-size: 12px;'> {timestamp}</span><br>
+                <div style='background: #1a1a1a; padding: 15px; border-radius: 10px; 
+                     border-left: 3px solid #00c853; margin-top: 5px;'>
+                    <b style='color: #00c853;'>Command:</b> 
+                    <code style='color: #0f0;'>{cmd}</code><br><br>
+                    <b style='color: #00c853;'>Description:</b> {desc}<br><br>
+                    <b style='color: #00c853;'>Output:</b><br>
+                    <pre style='color: #0f0; background: #0f0f0f; padding: 10px; 
+                         border-radius: 5px;'>{output}</pre>
+                </div>
+            </div>
+        """
+    return f"""
+        <div style='margin: 10px 0;'>
+            <span style='color: #00c853; font-weight: bold;'>🤖 Flux AI</span>
+            <span style='color: #666; font-size: 12px;'> {timestamp}</span><br>
+            <div style='background: #1a1a1a; padding: 15px; border-radius: 10px; 
+                 border-left: 3px solid #00c853; margin-top: 5px;'>
+                {response.replace(chr(10), '<br>')}
+            </div>
+        </div>
+    """
+
+def render_trace_badge(trace) -> str:
+    return f"""
+        <div style='color: #666; font-size: 11px; margin: 0 0 10px 0;'>⏱️ {trace.summary()}</div>
+    """
+
+class ChatHistoryIndex:
+    """Persistent SQLite FTS5 index of chat messages, generated commands and their outputs"""
+    
+    def __init__(self, db_path=HISTORY_DB):
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS messages (
+                id INTEGER PRIMARY KEY,
+                session_id TEXT NOT NULL,
+                entry_index INTEGER NOT NULL,
+                created REAL NOT NULL,
+                role TEXT NOT NULL,
+                agent TEXT,
+                content TEXT,
+                command TEXT,
+                output TEXT,
+                UNIQUE (session_id, entry_index)
+            )
+        """)
+        self.fts = self.create_fts()
+        self.conn.commit()
+    
+    def create_fts(self):
+        try:
+            self.conn.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+                    content, command, output, content='messages', content_rowid='id'
+                )
+            """)
+            self.conn.execute("""
+                CREATE TRIGGER IF NOT EXISTS messages_ai AFTER INSERT ON messages BEGIN
+                    INSERT INTO messages_fts(rowid, content, command, output)
+                    VALUES (new.id, new.content, new.command, new.output);
+                END
+            """)
+            self.conn.execute("""
+                CREATE TRIGGER IF NOT EXISTS messages_ad AFTER DELETE ON messages BEGIN
+                    INSERT INTO messages_fts(messages_fts, rowid, content, command, output)
+                    VALUES ('delete', old.id, old.content, old.command, old.output);
+                END
+            """)
+            return True
+        except sqlite3.OperationalError as e:
+            logger.warning(f"SQLite FTS5 unavailable, history search falls back to LIKE: {e}")
+            return False
+    
+    def add(self, session_id, entry_index, entry):
+        if entry["role"] == "user":
+            content, command, output = entry["text"], None, None
+        elif entry["role"] == "assistant" and entry["agent"] == "linux_command":
+            command, content, output = entry["result"]
+        elif entry["role"] == "assistant":
+            content, command, output = entry["result"], None, None
+        else:
+            return
+        
+        try:
+            with self.lock:
+                self.conn.execute(
+                    "INSERT OR IGNORE INTO messages "
+                    "(session_id, entry_index, created, role, agent, content, command, output) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (session_id, entry_index, time.time(), entry["role"], entry.get("agent"),
+                     content, command, output)
+                )
+                self.conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"History index error: {e}")
+    
+    def is_empty(self):
+        with self.lock:
+            return self.conn.execute("SELECT 1 FROM messages LIMIT 1").fetchone() is None
+    
+    def backfill(self, sessions_dir=SESSIONS_DIR):
+        # Index chats saved before the index existed
+        for path in sorted(Path(sessions_dir).glob("*.json")):
+            if path.name == "index.json":
+                continue
+            try:
+                with open(path, 'r') as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            for i, entry in enumerate(data.get("history", [])):
+                self.add(data.get("id", path.stem), i, entry)
+    
+    def search(self, query, limit=50):
+        terms = re.findall(r"\w+", query)
+        if not terms:
+            return []
+        
+        columns = "m.session_id, m.entry_index, m.created, m.role, m.agent, m.content, m.command, m.output"
+        with self.lock:
+            if self.fts:
+                # Quote every term so user input cannot inject FTS5 syntax; prefix-match each one
+                match = " ".join(f'"{term}"*' for term in terms)
+                rows = self.conn.execute(
+                    f"SELECT {columns} FROM messages_fts JOIN messages m ON m.id = messages_fts.rowid "
+                    "WHERE messages_fts MATCH ? ORDER BY bm25(messages_fts, 1.0, 2.0, 0.5) LIMIT ?",
+                    (match, limit)
+                ).fetchall()
+            else:
+                where = " AND ".join(
+                    "(m.content LIKE ? OR m.command LIKE ? OR m.output LIKE ?)" for _ in terms
+                )
+                params = [f"%{term}%" for term in terms for _ in range(3)]
+                rows = self.conn.execute(
+                    f"SELECT {columns} FROM messages m WHERE {where} ORDER BY m.created DESC LIMIT ?",
+                    (*params, limit)
+                ).fetchall()
+        
+        keys = ("session_id", "entry_index", "created", "role", "agent", "content", "command", "output")
+        return [dict(zip(keys, row)) for row in rows]
+
+CHAT_VIEW_STYLE = """
+            QTextEdit {
+                background: #0f0f0f;
+                color: #ffffff;
+                border: none;
+                font-family: 'Consolas', 'Monaco', 'Courier New', monospace;
+                font-size: 14px;
+                padding: 20px;
+                line-height: 1.5;
+            }
+            QScrollBar:vertical {
+                background: #1a1a1a;
+                width: 12px;
+                border-radius: 6px;
+            }
+            QScrollBar::handle:vertical {
+                background: #333;
+                border-radius: 6px;
+                min-height: 40px;
+            }
+            QScrollBar::handle:vertical:hover {
+                background: #00c853;
+            }
+        """
+
+WELCOME_HTML = """
+            <p style='color: #00c853; text-align: center; font-size: 16px;'>
+                Welcome to Flux AI Chat!<br>
+                <span style='color: #888; font-size: 14px;'>Type a Linux command or ask me anything...</span>
+            </p>
+        """
+
+def render_error(error: str) -> str:
+    return f"""
+        <div style='color: #ff3366; text-align: center; margin: 10px;'>
+            ❌ Error: {error}
+        </div>
+    """
+
+def message_anchor(index: int) -> str:
+    return f"<a name='msg-{index}'></a>"
+
+def render_entry(entry: dict) -> str:
+    if entry["role"] == "user":
+        return render_user_message(entry["text"], entry["timestamp"])
+    if entry["role"] == "error":
+        return render_error(entry["text"])
+    response = entry["result"]
+    # JSON turns the linux_command tuple into a list
+    return render_response(entry["agent"], tuple(response) if isinstance(response, list) else response,
+                           entry["timestamp"])
+
+class ChatSession(QWidget):
+    """One conversation tab; its view and history are dropped while inactive and reloaded from disk"""
+    
+    def __init__(self, session_id=None, title="New chat", lang="English"):
+        super().__init__()
+        self.session_id = session_id or uuid.uuid4().hex[:12]
+        self.path = SESSIONS_DIR / f"{self.session_id}.json"
+        self.title = title
+        self.language = lang
+        self.history = None
+        self.view = None
+        self.worker = None
+        
+        layout = QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        self.setLayout(layout)
+    
+    @property
+    def busy(self):
+        return self.worker is not None and self.worker.isRunning()
+    
+    def load(self):
+        if self.view is not None:
+            return
+        
+        self.history = []
+        if self.path.exists():
+            try:
+                with open(self.path, 'r') as f:
+                    self.history = json.load(f).get("history", [])
+            except (OSError, ValueError) as e:
+                logger.error(f"Failed to load session {self.session_id}: {e}")
+        
+        self.view = QTextEdit()
+        self.view.setReadOnly(True)
+        self.view.setStyleSheet(CHAT_VIEW_STYLE)
+        # One setHtml is far cheaper than replaying every append
+        self.view.setHtml(WELCOME_HTML + "".join(
+            message_anchor(i) + render_entry(entry) for i, entry in enumerate(self.history)
+        ))
+        self.view.moveCursor(QTextCursor.End)
+        self.layout().addWidget(self.view)
+    
+    def unload(self):
+        if self.view is None or self.busy:
+            return
+        self.save()
+        self.layout().removeWidget(self.view)
+        self.view.deleteLater()
+        self.view = None
+        self.history = None
+    
+    def save(self):
+        if self.history is None:
+            return
+        SESSIONS_DIR.mkdir(parents=True, exist_ok=True)
+        try:
+            with open(self.path, 'w') as f:
+                json.dump({
+                    "id": self.session_id, "title": self.title,
+                    "language": self.language, "history": self.history
+                }, f, ensure_ascii=False)
+        except OSError as e:
+            logger.error(f"Failed to save session {self.session_id}: {e}")
+    
+    def add_entry(self, entry, html=None):
+        self.load()
+        self.history.append(entry)
+        self.view.append(message_anchor(len(self.history) - 1) + (html or render_entry(entry)))
+        return len(self.history) - 1
+    
+    def scroll_to(self, entry_index):
+        self.load()
+        self.view.scrollToAnchor(f"msg-{entry_index}")
+    
+    def append_html(self, html):
+        # Transient output (step progress, timing badges) that is not kept in history
+        self.load()
+        self.view.append(html)
+
+class SearchDialog(QDialog):
+    def __init__(self, parent, history_index, query=""):
+        super().__init__(parent)
+        self.history_index = history_index
+        self.setWindowTitle("Search History")
+        self.resize(800, 560)
+        self.setStyleSheet("""
+            QDialog, QListWidget {
+                background: #0f0f0f;
+                color: #ffffff;
+            }
+            QLineEdit {
+                background: #1a1a1a;
+                border: 2px solid #333;
+                color: white;
+                padding: 10px;
+                font-size: 14px;
+                border-radius: 8px;
+            }
+            QLineEdit:focus {
+                border: 2px solid #00c853;
+            }
+            QListWidget {
+                border: 2px solid #333;
+                font-size: 13px;
+            }
+            QListWidget::item {
+                padding: 8px;
+                border-bottom: 1px solid #1a1a1a;
+            }
+            QListWidget::item:selected {
+                background: #1f3d2a;
+            }
+            QPushButton {
+                background: #1a1a1a;
+                color: white;
+                border: 2px solid #333;
+                padding: 6px 14px;
+                font-size: 12px;
+                font-weight: bold;
+                border-radius: 6px;
+                min-height: 30px;
+            }
+            QPushButton:hover {
+                background: #00b248;
+                border: 2px solid #00b248;
+            }
+            QPushButton:disabled {
+                color: #666;
+            }
+        """)
+        
+        layout = QVBoxLayout()
+        self.query_input = QLineEdit(query)
+        self.query_input.setPlaceholderText("Search messages, commands and outputs...")
+        self.query_input.returnPressed.connect(self.run_search)
+        self.status_label = QLabel()
+        self.status_label.setStyleSheet("color: #888; font-size: 12px;")
+        self.results_list = QListWidget()
+        self.results_list.currentRowChanged.connect(self.update_buttons)
+        self.results_list.itemDoubleClicked.connect(lambda item: self.choose("jump"))
+        
+        button_layout = QHBoxLayout()
+        button_layout.addStretch()
+        self.jump_btn = QPushButton("Go to message")
+        self.jump_btn.clicked.connect(lambda: self.choose("jump"))
+        self.rerun_btn = QPushButton("Re-run command")
+        self.rerun_btn.clicked.connect(lambda: self.choose("rerun"))
+        button_layout.addWidget(self.jump_btn)
+        button_layout.addWidget(self.rerun_btn)
+        
+        layout.addWidget(self.query_input)
+        layout.addWidget(self.status_label)
+        layout.addWidget(self.results_list)
+        layout.addLayout(button_layout)
+        self.setLayout(layout)
+        
+        self.results = []
+        self.action = None
+        self.selected = None
+        self.run_search()
+    
+    def run_search(self):
+        start = time.perf_counter()
+        self.results = self.history_index.search(self.query_input.text())
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        
+        self.results_list.clear()
+        for result in self.results:
+            when = time.strftime("%Y-%m-%d %H:%M", time.localtime(result["created"]))
+            text = result["command"] or result["content"] or ""
+            label = "$ " if result["command"] else ("You: " if result["role"] == "user" else "Flux AI: ")
+            self.results_list.addItem(f"{when}  {label}{' '.join(text.split())[:160]}")
+        self.status_label.setText(f"{len(self.results)} results in {elapsed_ms:.1f} ms")
+        self.results_list.setCurrentRow(0 if self.results else -1)
+        self.update_buttons()
+    
+    def update_buttons(self, *args):
+        result = self.current_result()
+        self.jump_btn.setEnabled(result is not None)
+        self.rerun_btn.setEnabled(bool(result and result["command"]))
+    
+    def current_result(self):
+        row = self.results_list.currentRow()
+        return self.results[row] if 0 <= row < len(self.results) else None
+    
+    def choose(self, action):
+        self.selected = self.current_result()
+        if self.selected is not None:
+            self.action = action
+            self.accept()
 
 class FluxAIChatGUI(QWidget):
     def __init__(self):
         super().__init__()
         self.config_manager = ConfigManager()
         self.chat_bot = None
+        self.daemon_client = None
+        self.voice_player = VoicePlayer()
+        self.history_index = ChatHistoryIndex()
+        if self.history_index.is_empty():
+            self.history_index.backfill()
         self.init_ui()
+        self.restore_sessions()
+        self.init_profiling()
         self.initialize_chatbot()
     
+    def init_profiling(self):
+        # Hidden debug shortcut; FLUX_PROFILE=1 or --profile profiles from launch
+        QShortcut(QKeySequence("Ctrl+Shift+P"), self, self.toggle_profiling)
+        self.stall_timer = QTimer(self)
+        self.stall_timer.setInterval(50)
+        self.stall_timer.timeout.connect(self.check_stall)
+        if os.environ.get("FLUX_PROFILE") == "1":
+            self.start_profiling()
+    
+    def start_profiling(self):
+        profiler.start()
+        self.last_tick = time.perf_counter()
+        self.stall_timer.start()
+    
+    def stop_profiling(self):
+        self.stall_timer.stop()
+        extra = {
+            "chat_html_bytes": sum(len(session.view.toHtml()) for session in self.sessions() if session.view),
+            "loaded_views": sum(1 for session in self.sessions() if session.view),
+            "live_objects": count_live_objects(QThread, ChatWorker, QTextEdit),
+            "pygame_mixer_initialized": bool(pygame.mixer.get_init()),
+        }
+        return profiler.stop(extra)
+    
+    def toggle_profiling(self):
+        if profiler.active:
+            report_dir = self.stop_profiling()
+            self.current_session().append_html(f"<p style='color: #888;'>🩺 Profiling report saved to {report_dir}</p>")
+        else:
+            self.start_profiling()
+            self.current_session().append_html("<p style='color: #888;'>🩺 Profiling started (Ctrl+Shift+P to stop)</p>")
+    
+    def check_stall(self):
+        now = time.perf_counter()
+        lag_ms = (now - self.last_tick) * 1000 - self.stall_timer.interval()
+        self.last_tick = now
+        if lag_ms > self.config_manager.get("debug.stall_threshold_ms", 200):
+            logger.warning(f"Event loop stalled for {lag_ms:.0f}ms")
+            profiler.record_stall(lag_ms)
+    
+    def closeEvent(self, event):
+        if profiler.active:
+            self.stop_profiling()
+        for session in self.sessions():
+            session.save()
+        self.save_session_index()
+        if self.chat_bot:
+            self.chat_bot.close()
+        super().closeEvent(event)
+    
     def init_ui(self):
         self.setWindowTitle("Flux AI Chat")
         self.setMinimumSize(1000, 800)
@@ -652,8 +2227,29 @@ class FluxAIChatGUI(QWidget):
         
         top_layout.addWidget(lang_label)
         top_layout.addWidget(self.language_combo)
+        # History search
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("🔍 Search history...")
+        self.search_input.setStyleSheet("""
+            QLineEdit {
+                background: #1a1a1a;
+                border: 2px solid #333;
+                color: white;
+                padding: 6px 10px;
+                font-size: 12px;
+                border-radius: 6px;
+                min-width: 220px;
+            }
+            QLineEdit:focus {
+                border: 2px solid #00c853;
+            }
+        """)
+        self.search_input.returnPressed.connect(self.open_search)
+        QShortcut(QKeySequence("Ctrl+F"), self, self.search_input.setFocus)
+        
         top_layout.addWidget(self.voice_btn)
         top_layout.addStretch()
+        top_layout.addWidget(self.search_input)
         top_layout.addWidget(settings_btn)
         
         top_bar.setLayout(top_layout)
@@ -717,40 +2313,31 @@ class FluxAIChatGUI(QWidget):
         banner_widget.setLayout(banner_layout)
         main_layout.addWidget(banner_widget)
         
-        # Chat display
-        self.chat_display = QTextEdit()
-        self.chat_display.setReadOnly(True)
-        self.chat_display.setStyleSheet("""
-            QTextEdit {
-                background: #0f0f0f;
-                color: #ffffff;
-                border: none;
-                font-family: 'Consolas', 'Monaco', 'Courier New', monospace;
-                font-size: 14px;
-                padding: 20px;
-                line-height: 1.5;
-            }
-            QScrollBar:vertical {
+        # Chat sessions, one conversation per tab
+        self.tabs = QTabWidget()
+        self.tabs.setTabsClosable(True)
+        self.tabs.setDocumentMode(True)
+        self.tabs.setStyleSheet("""
+            QTabBar::tab {
                 background: #1a1a1a;
-                width: 12px;
-                border-radius: 6px;
-            }
-            QScrollBar::handle:vertical {
-                background: #333;
-                border-radius: 6px;
-                min-height: 40px;
+                color: #a0a0a0;
+                padding: 8px 16px;
+                border: none;
+                min-width: 120px;
             }
-            QScrollBar::handle:vertical:hover {
-                background: #00c853;
+            QTabBar::tab:selected {
+                background: #0f0f0f;
+                color: #00c853;
+                border-bottom: 2px solid #00c853;
             }
         """)
-        self.chat_display.setHtml("""
-            <p style='color: #00c853; text-align: center; font-size: 16px;'>
-                Welcome to Flux AI Chat!<br>
-                <span style='color: #888; font-size: 14px;'>Type a Linux command or ask me anything...</span>
-            </p>
-        """)
-        main_layout.addWidget(self.chat_display)
+        new_tab_btn = QPushButton("+")
+        new_tab_btn.setFixedSize(32, 28)
+        new_tab_btn.setStyleSheet("background: #1a1a1a; color: #00c853; border: none; font-weight: bold;")
+        new_tab_btn.clicked.connect(lambda: self.new_session())
+        self.tabs.setCornerWidget(new_tab_btn, Qt.TopRightCorner)
+        self.tabs.tabCloseRequested.connect(self.close_session)
+        main_layout.addWidget(self.tabs)
         
         # Input area
         input_widget = QWidget()
@@ -816,10 +2403,89 @@ class FluxAIChatGUI(QWidget):
         
         self.setLayout(main_layout)
     
+    def sessions(self):
+        return [self.tabs.widget(i) for i in range(self.tabs.count())]
+    
+    def current_session(self):
+        return self.tabs.currentWidget()
+    
+    def restore_sessions(self):
+        index_file = SESSIONS_DIR / "index.json"
+        index = {"open": [], "current": 0}
+        if index_file.exists():
+            try:
+                with open(index_file, 'r') as f:
+                    index = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.error(f"Failed to load session index: {e}")
+        
+        for info in index.get("open", []):
+            session = ChatSession(info["id"], info.get("title", "Chat"), info.get("language", "English"))
+            self.tabs.addTab(session, session.title)
+        if not self.tabs.count():
+            self.new_session(save=False)
+        
+        self.tabs.currentChanged.connect(self.switch_session)
+        self.tabs.setCurrentIndex(min(index.get("current", 0), self.tabs.count() - 1))
+        self.switch_session(self.tabs.currentIndex())
+    
+    def save_session_index(self):
+        SESSIONS_DIR.mkdir(parents=True, exist_ok=True)
+        index = {
+            "open": [
+                {"id": session.session_id, "title": session.title, "language": session.language}
+                for session in self.sessions()
+            ],
+            "current": self.tabs.currentIndex()
+        }
+        try:
+            with open(SESSIONS_DIR / "index.json", 'w') as f:
+                json.dump(index, f, indent=4, ensure_ascii=False)
+        except OSError as e:
+            logger.error(f"Failed to save session index: {e}")
+    
+    def new_session(self, save=True):
+        session = ChatSession(lang=self.config_manager.get("preferences.language", "English"))
+        self.tabs.setCurrentIndex(self.tabs.addTab(session, session.title))
+        if save:
+            self.save_session_index()
+    
+    def close_session(self, index):
+        session = self.tabs.widget(index)
+        if session.busy:
+            QMessageBox.information(self, "Busy", "Wait for this chat to finish before closing it.")
+            return
+        self.tabs.removeTab(index)
+        session.path.unlink(missing_ok=True)
+        session.deleteLater()
+        if not self.tabs.count():
+            self.new_session(save=False)
+        self.save_session_index()
+    
+    def switch_session(self, index):
+        current = self.tabs.widget(index)
+        if current is None:
+            return
+        # Only the visible tab (and tabs still waiting on a reply) keep a view in memory
+        for session in self.sessions():
+            if session is not current:
+                session.unload()
+        current.load()
+        
+        global language
+        language = current.language
+        self.language_combo.blockSignals(True)
+        self.language_combo.setCurrentText(current.language)
+        self.language_combo.blockSignals(False)
+        self.send_btn.setEnabled(not current.busy)
+    
     def change_language(self, lang):
         global language
         language = lang
         self.config_manager.set("preferences.language", lang)
+        session = self.current_session()
+        if session is not None:
+            session.language = lang
     
     def toggle_voice(self, checked):
         self.config_manager.set("preferences.voice_enabled", checked)
@@ -828,9 +2494,27 @@ class FluxAIChatGUI(QWidget):
     def open_settings(self):
         dialog = SettingsDialog(self, self.config_manager)
         if dialog.exec_():
-            self.initialize_chatbot()
+            use_daemon = True
+            if self.daemon_client:
+                try:
+                    self.daemon_client.reload()
+                except (OSError, RuntimeError) as e:
+                    logger.error(f"Daemon reload failed, using an in-process chat bot: {e}")
+                    use_daemon = False
+            self.initialize_chatbot(use_daemon)
     
-    def initialize_chatbot(self):
+    def initialize_chatbot(self, use_daemon=True):
+        if self.chat_bot:
+            self.chat_bot.close()
+            self.chat_bot = None
+        
+        client = DaemonClient()
+        if use_daemon and client.is_alive():
+            logger.info(f"Using Flux AI daemon at {client.socket_path}")
+            self.daemon_client = client
+            return
+        self.daemon_client = None
+        
         try:
             self.chat_bot = GeminiChatBot(self.config_manager)
         except Exception as e:
@@ -843,98 +2527,204 @@ class FluxAIChatGUI(QWidget):
         if not message:
             return
         
-        if not self.chat_bot:
+        if self.daemon_client and not self.daemon_client.is_alive():
+            # The daemon went away after startup; keep chatting in-process
+            logger.warning("Flux AI daemon is gone, falling back to an in-process chat bot")
+            self.initialize_chatbot(use_daemon=False)
+        
+        if not self.chat_bot and not self.daemon_client:
             QMessageBox.warning(self, "Setup Required", 
                 "Please configure your API keys in Settings first.")
             return
         
+        session = self.current_session()
+        # Enter still fires returnPressed while the send button is disabled
+        if session.busy:
+            return
         self.input_field.clear()
         self.send_btn.setEnabled(False)
         
+        trace = RequestTrace(message) if tracing_enabled(self.config_manager) else None
+        
         # Add user message
         timestamp = QDateTime.currentDateTime().toString("HH:mm")
-        self.chat_display.append(f"""
-            <div style='text-align: right; margin: 10px 0;'>
-                <span style='color: #666; font-size: 12px;'>{timestamp}</span><br>
-                <span style='background: #1a1a1a; color: white; padding: 10px; 
-                      border-radius: 10px; border-left: 3px solid #00c853;'>
-                    {message}
-                </span>
-            </div>
-        """)
+        self.record_entry(session, {"role": "user", "text": message, "timestamp": timestamp})
+        if session.title == "New chat":
+            session.title = message[:24] + ("…" if len(message) > 24 else "")
+            self.tabs.setTabText(self.tabs.indexOf(session), session.title)
+            self.save_session_index()
         
         try:
-            agent_type = agent_selector(self.chat_bot, message)
-            self.worker = ChatWorker(self.chat_bot, agent_type, message, self.config_manager)
-            self.worker.finished.connect(self.handle_response)
-            self.worker.error.connect(self.handle_error)
-            self.worker.start()
+            self.start_worker(session, ChatWorker(
+                self.chat_bot, message, self.config_manager, session.language, self.daemon_client, trace
+            ))
         except Exception as e:
-            self.handle_error(str(e))
+            self.handle_error(session, str(e))
+    
+    def start_worker(self, session, worker):
+        session.worker = worker
+        session.worker.finished.connect(lambda result, s=session: self.handle_response(s, result))
+        session.worker.error.connect(lambda error, s=session: self.handle_error(s, error))
+        session.worker.step_finished.connect(lambda step, s=session: s.append_html(render_step(step)))
+        session.worker.start()
+    
+    def record_entry(self, session, entry, html=None):
+        index = session.add_entry(entry, html)
+        self.history_index.add(session.session_id, index, entry)
+    
+    def open_search(self):
+        dialog = SearchDialog(self, self.history_index, self.search_input.text().strip())
+        if not dialog.exec_():
+            return
+        result = dialog.selected
+        
+        if dialog.action == "rerun":
+            session = self.current_session()
+            if session.busy:
+                QMessageBox.information(self, "Busy", "Wait for this chat to finish first.")
+                return
+            timestamp = QDateTime.currentDateTime().toString("HH:mm")
+            self.record_entry(session, {"role": "user", "text": f"↻ {result['command']}", "timestamp": timestamp})
+            self.send_btn.setEnabled(False)
+            self.start_worker(session, CommandWorker(result["command"], result["content"]))
+            return
+        
+        for i, session in enumerate(self.sessions()):
+            if session.session_id == result["session_id"]:
+                self.tabs.setCurrentIndex(i)
+                session.scroll_to(result["entry_index"])
+                return
+        QMessageBox.information(self, "Chat Closed",
+            "That chat's tab was closed; its text is still shown in the search results.")
     
-    def handle_response(self, result):
+    @profiled("handle_response")
+    def handle_response(self, session, result):
         agent_type, response = result
         timestamp = QDateTime.currentDateTime().toString("HH:mm")
+        trace = session.worker.trace
         
-        if agent_type == "linux_command":
-            cmd, desc, output = response
-            html = f"""
-                <div style='margin: 10px 0;'>
-                    <span style='color: #00c853; font-weight: bold;'>🤖 Flux AI</span>
-                    <span style='color: #666; font-size: 12px;'> {timestamp}</span><br>
-                    <div style='background: #1a1a1a; padding: 15px; border-radius: 10px; 
-                         border-left: 3px solid #00c853; margin-top: 5px;'>
-                        <b style='color: #00c853;'>Command:</b> 
-                        <code style='color: #0f0;'>{cmd}</code><br><br>
-                        <b style='color: #00c853;'>Description:</b> {desc}<br><br>
-                        <b style='color: #00c853;'>Output:</b><br>
-                        <pre style='color: #0f0; background: #0f0f0f; padding: 10px; 
-                             border-radius: 5px;'>{output}</pre>
-                    </div>
-                </div>
-            """
-            
-            if self.config_manager.get("preferences.voice_enabled", False):
-                self.speak_text(f"{desc}. {output}")
-        else:
-            html = f"""
-                <div style='margin: 10px 0;'>
-                    <span style='color: #00c853; font-weight: bold;'>🤖 Flux AI</span>
-                    <span style='color: #666; font-size: 12px;'> {timestamp}</span><br>
-                    <div style='background: #1a1a1a; padding: 15px; border-radius: 10px; 
-                         border-left: 3px solid #00c853; margin-top: 5px;'>
-                        {response.replace(chr(10), '<br>')}
-                    </div>
-                </div>
-            """
-            
-            if self.config_manager.get("preferences.voice_enabled", False):
-                self.speak_text(response)
+        with self.traced(trace, "render"):
+            entry = {"role": "assistant", "agent": agent_type, "result": response, "timestamp": timestamp}
+            self.record_entry(session, entry, render_response(
+                agent_type, response, timestamp, session.worker.streamed_steps > 0
+            ))
         
-        self.chat_display.append(html)
-        self.send_btn.setEnabled(True)
+        if trace is not None:
+            trace.finish()
+            session.append_html(render_trace_badge(trace))
+        
+        if self.config_manager.get("preferences.voice_enabled", False):
+            if agent_type == "linux_command":
+                cmd, desc, output = response
+                self.speak_text(f"{desc}. {output}", session.language, trace)
+            else:
+                self.speak_text(response, session.language, trace)
+        elif trace is not None:
+            export_trace(trace)
+        
+        self.finish_request(session)
     
-    def handle_error(self, error):
-        self.chat_display.append(f"""
-            <div style='color: #ff3366; text-align: center; margin: 10px;'>
-                ❌ Error: {error}
-            </div>
-        """)
-        self.send_btn.setEnabled(True)
+    @contextmanager
+    def traced(self, trace, name):
+        token = current_trace.set(trace)
+        try:
+            with trace_span(name):
+                yield
+        finally:
+            current_trace.reset(token)
     
-    def speak_text(self, text):
+    def handle_error(self, session, error):
+        self.record_entry(session, {"role": "error", "text": error})
+        self.finish_request(session)
+    
+    def finish_request(self, session):
+        session.save()
+        if session is self.current_session():
+            self.send_btn.setEnabled(True)
+        else:
+            # Replies to background tabs are kept on disk only
+            session.worker.wait()
+            session.unload()
+    
+    def speak_text(self, text, lang_name=None, trace=None):
         lang_codes = {
             "English": "en", "Turkish": "tr", "Spanish": "es",
             "German": "de", "French": "fr", "Russian": "ru"
         }
-        QTimer.singleShot(100, lambda: play_voice(
-            text, 
-            self.config_manager.get("preferences.voice_volume", 0.7),
-            lang_codes.get(language, "en")
-        ))
+        volume = self.config_manager.get("preferences.voice_volume", 0.7)
+        lang = lang_codes.get(lang_name or language, "en")
+        if self.daemon_client:
+            try:
+                self.daemon_client.speak(text, volume, lang)
+                if trace is not None:
+                    export_trace(trace)
+                return
+            except (OSError, RuntimeError) as e:
+                logger.error(f"Daemon voice error: {e}")
+        self.voice_player.speak(text, volume, lang, trace, self.config_manager.get("deadlines.tts"))
+
+def run_daemon():
+    server = FluxDaemon(ConfigManager())
+    logger.info(f"Flux AI daemon listening on {server.socket_path}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.chat_bot.close()
+        server.server_close()
+
+def run_cli(message, lang=None):
+    config_manager = ConfigManager()
+    trace = RequestTrace(message) if tracing_enabled(config_manager) else None
+    current_trace.set(trace)
+    
+    streamed = []
+    
+    def print_step(step, output):
+        streamed.append(step["id"])
+        print(f"$ {step['command']}\n{output}\n", flush=True)
+    
+    client = DaemonClient()
+    if client.is_alive():
+        agent_type, result = client.chat(message, lang, trace, print_step)
+    else:
+        chat_bot = GeminiChatBot(config_manager)
+        try:
+            agent_type, result = handle_message(message, chat_bot, config_manager, lang, print_step)
+        finally:
+            chat_bot.close()
+    
+    if agent_type == "linux_command":
+        cmd, desc, output = result
+        print(desc if streamed else f"$ {cmd}\n\n{desc}\n\n{output}")
+    else:
+        print(result.strip())
+    
+    if trace is not None:
+        trace.finish()
+        print(f"\n⏱️ {trace.summary()}", file=sys.stderr)
+        export_trace(trace)
 
 def main():
-    app = QApplication(sys.argv)
+    parser = argparse.ArgumentParser(description="Flux AI Chat")
+    parser.add_argument("--daemon", action="store_true", help="run the shared background daemon")
+    parser.add_argument("--ask", metavar="MESSAGE", help="send one message from the terminal and exit")
+    parser.add_argument("--language", help="response language for --ask")
+    parser.add_argument("--profile", action="store_true", help="profile the GUI until it is closed")
+    args, qt_args = parser.parse_known_args()
+    
+    if args.profile:
+        os.environ["FLUX_PROFILE"] = "1"
+    
+    if args.daemon:
+        run_daemon()
+        return
+    if args.ask:
+        run_cli(args.ask, args.language)
+        return
+    
+    app = QApplication(sys.argv[:1] + qt_args)
     app.setStyle("Fusion")
     
     window = FluxAIChatGUI()
@@ -0,0 +1,98 @@
+import pytest
+
+import flux_ai
+
+
+def test_missing_id_does_not_clash_with_explicit_id():
+    description, steps = flux_ai.parse_command_plan(
+        '<plan><description>d</description>'
+        '<step id="2"><linux>echo A</linux></step>'
+        '<step><linux>echo B</linux></step></plan>'
+    )
+    assert len({step["id"] for step in steps}) == 2
+
+    results = flux_ai.execute_plan(steps)
+    assert [output for _, output in results] == ["✅ Output:\nA", "✅ Output:\nB"]
+
+
+def test_duplicate_ids_are_rejected():
+    with pytest.raises(ValueError, match="duplicate step ids"):
+        flux_ai.parse_command_plan(
+            '<plan><step id="a"><linux>echo A</linux></step>'
+            '<step id="a"><linux>echo B</linux></step></plan>'
+        )
+
+
+@pytest.mark.parametrize("reply", [
+    '<plan><step id="a"><linux>  </linux></step><step id="b" depends="a"><linux>echo B</linux></step></plan>',
+    '<plan><step id="a"></step></plan>',
+    '<command><linux></linux><description>d</description></command>',
+])
+def test_empty_commands_are_rejected(reply):
+    with pytest.raises(ValueError):
+        flux_ai.parse_command_plan(reply)
+
+
+def test_state_changing_steps_run_in_plan_order(tmp_path):
+    marker = tmp_path / "marker"
+    _, steps = flux_ai.parse_command_plan(
+        f'<plan><step id="a"><linux>sleep 0.2 &amp;&amp; touch {marker}</linux></step>'
+        f'<step id="b"><linux>ls {marker}</linux></step></plan>'
+    )
+    results = flux_ai.execute_plan(steps)
+    assert results[1][1].startswith("✅")
+
+
+@pytest.mark.parametrize("command, read_only", [
+    ("df -h", True),
+    ("ps aux --sort=-%mem | head", True),
+    ("echo hi > /tmp/x", False),
+    ("rm -rf build", False),
+    ("ls; reboot", False),
+    ("cat $(which rm)", False),
+])
+def test_is_read_only(command, read_only):
+    assert flux_ai.is_read_only(command) is read_only
+
+
+def test_dependents_of_failed_steps_are_skipped():
+    _, steps = flux_ai.parse_command_plan(
+        '<plan><step id="a"><linux>ls /nonexistent-flux-path</linux></step>'
+        '<step id="b" depends="a"><linux>echo B</linux></step>'
+        '<step id="c" depends="b"><linux>echo C</linux></step>'
+        '<step id="d"><linux>echo D</linux></step></plan>'
+    )
+    outputs = [output for _, output in flux_ai.execute_plan(steps)]
+    assert outputs[0].startswith("❌")
+    assert outputs[1].startswith("⏭️") and outputs[2].startswith("⏭️")
+    assert outputs[3] == "✅ Output:\nD"
+
+
+def test_dependency_cycles_are_skipped():
+    _, steps = flux_ai.parse_command_plan(
+        '<plan><step id="a" depends="b"><linux>echo A</linux></step>'
+        '<step id="b" depends="a"><linux>echo B</linux></step>'
+        '<step id="c"><linux>echo C</linux></step></plan>'
+    )
+    outputs = [output for _, output in flux_ai.execute_plan(steps)]
+    assert outputs == ["⏭️ Skipped: circular dependency"] * 2 + ["✅ Output:\nC"]
+
+
+def test_unknown_and_self_dependencies_are_dropped():
+    _, steps = flux_ai.parse_command_plan(
+        '<plan><step id="a" depends="a, missing"><linux>echo A</linux></step></plan>'
+    )
+    assert steps[0]["depends"] == []
+
+
+@pytest.mark.parametrize("text, complex_request", [
+    ("show disk usage", False),
+    ("cancel my subscription renewal", False),
+    ("show the description of this package", False),
+    ("why is my machine slow", True),
+    ("write a script to rotate logs", True),
+    ("list files and then sort them", True),
+    (" ".join(["word"] * 26), True),
+])
+def test_is_complex_request(text, complex_request):
+    assert flux_ai.is_complex_request(text) is complex_request
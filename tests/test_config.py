@@ -0,0 +1,47 @@
+import flux_ai
+
+
+class LoadedConfig(flux_ai.ConfigManager):
+    """Config as loaded from an existing config.json, without touching ~/.flux_ai_chat"""
+
+    def __init__(self, loaded):
+        self.config = self.merge_defaults(self.get_default_config(), loaded)
+
+    def save_config(self):
+        return True
+
+
+def chat_bot_for(config_manager):
+    chat_bot = flux_ai.GeminiChatBot.__new__(flux_ai.GeminiChatBot)
+    chat_bot.config_manager = config_manager
+    return chat_bot
+
+
+def test_old_config_gains_new_sections_and_keeps_its_values():
+    config = LoadedConfig({
+        "api_keys": {"gemini": "key"},
+        "advanced": {"model": "gemini-2.0-flash", "temperature": 0.2},
+    })
+    assert config.get("api_keys.gemini") == "key"
+    assert config.get("api_keys.weather") == ""
+    assert config.get("advanced.model") == "gemini-2.0-flash"
+    assert config.get("advanced.max_concurrency") == 4
+    assert config.get("deadlines.linux_command") == 45
+    assert config.get("agents.linux_command.escalate.model") == "gemini-1.5-pro"
+
+
+def test_local_provider_does_not_inherit_gemini_models():
+    config = LoadedConfig({"agents": {"weather_gether": {"provider": "local"}}})
+    chat_bot = chat_bot_for(config)
+
+    assert "model" not in chat_bot.profile_for("weather_gether")
+    escalated = chat_bot.profile_for("weather_gether", escalated=True)
+    assert escalated["provider"] == "gemini"
+    assert escalated["model"] == "gemini-1.5-flash"
+
+
+def test_escalation_without_provider_stays_on_gemini_for_gemini_models():
+    config = LoadedConfig({"agents": {"tech_chat": {
+        "provider": "local", "escalate": {"model": "gemini-1.5-pro"}
+    }}})
+    assert chat_bot_for(config).provider_for("tech_chat", escalated=True) == "gemini"
@@ -0,0 +1,101 @@
+import time
+
+import pytest
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+import flux_ai
+
+
+@pytest.fixture
+def deadline():
+    def set_deadline(seconds):
+        deadline = flux_ai.Deadline(seconds)
+        token = flux_ai.current_deadline.set(deadline)
+        tokens.append(token)
+        return deadline
+
+    tokens = []
+    yield set_deadline
+    for token in reversed(tokens):
+        flux_ai.current_deadline.reset(token)
+
+
+def test_no_deadline_uses_stage_cap():
+    assert flux_ai.stage_timeout() is None
+    assert flux_ai.stage_timeout(10) == 10
+    assert not flux_ai.deadline_expired()
+
+
+def test_stage_timeout_is_capped_by_remaining_budget(deadline):
+    deadline(5)
+    assert 4 < flux_ai.stage_timeout() <= 5
+    assert flux_ai.stage_timeout(1) == 1
+    assert 4 < flux_ai.stage_timeout(10) <= 5
+
+
+def test_expired_deadline_raises(deadline):
+    deadline(0)
+    assert flux_ai.deadline_expired()
+    with pytest.raises(flux_ai.DeadlineExceeded):
+        flux_ai.stage_timeout(10)
+
+
+def test_scope_narrows_but_never_extends(deadline):
+    deadline(1)
+    with flux_ai.deadline_scope(0.5):
+        assert flux_ai.stage_timeout() <= 0.5
+    with flux_ai.deadline_scope(60):
+        assert flux_ai.stage_timeout() <= 1
+    assert 0.5 < flux_ai.stage_timeout() <= 1
+
+
+def test_budget_is_measured_from_the_start(deadline):
+    request = deadline(30)
+    request.started -= 10
+    request.set_budget(15)
+    assert 4 < request.remaining() <= 5
+
+
+def test_plan_skips_steps_once_the_deadline_passed(deadline):
+    deadline(0.3)
+    _, steps = flux_ai.parse_command_plan(
+        '<plan><step id="a"><linux>sleep 0.5</linux></step>'
+        '<step id="b" depends="a"><linux>echo late</linux></step></plan>'
+    )
+    outputs = [output for _, output in flux_ai.execute_plan(steps)]
+    assert outputs[0] == "⏱️ Command timed out"
+    assert outputs[1].startswith("⏭️")
+
+
+class SlowModel(BaseChatModel):
+    latency: float = 1.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "slow"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        time.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="too late"))])
+
+
+class MemoryConfig(flux_ai.ConfigManager):
+    def __init__(self):
+        self.config = self.get_default_config()
+
+    def save_config(self):
+        return True
+
+
+def test_model_calls_past_the_deadline_do_not_block_later_calls(deadline):
+    chat_bot = flux_ai.GeminiChatBot(MemoryConfig(), model=SlowModel())
+    deadline(0.1)
+    for _ in range(3):
+        assert chat_bot.process_request("hi", "prompt", "tech_chat") is None
+
+    chat_bot.model = SlowModel(latency=0.01)
+    deadline(0.5)
+    assert chat_bot.process_request("hi", "prompt", "tech_chat") == "too late"
+    chat_bot.close()
@@ -0,0 +1,63 @@
+import json
+
+import pytest
+
+import flux_ai
+
+
+@pytest.fixture(params=[True, False], ids=["fts5", "like"])
+def index(request, tmp_path, monkeypatch):
+    if not request.param:
+        monkeypatch.setattr(flux_ai.ChatHistoryIndex, "create_fts", lambda self: False)
+    index = flux_ai.ChatHistoryIndex(tmp_path / "history.db")
+    index.add("s1", 0, {"role": "user", "text": "how full is my disk"})
+    index.add("s1", 1, {
+        "role": "assistant", "agent": "linux_command",
+        "result": ["df -h", "Shows disk usage.", "✅ Output:\n/dev/nvme0n1p2  80%"]
+    })
+    index.add("s2", 0, {"role": "assistant", "agent": "tech_chat", "result": "ZFS checksums everything."})
+    index.add("s2", 1, {"role": "error", "text": "not indexed"})
+    return index
+
+
+def test_prefix_matching(index):
+    assert [(r["session_id"], r["entry_index"]) for r in index.search("checks")] == [("s2", 0)]
+
+
+def test_matches_commands_and_outputs(index):
+    assert [r["command"] for r in index.search("df")] == ["df -h"]
+    assert [r["entry_index"] for r in index.search("nvme0n1p2")] == [1]
+
+
+def test_all_terms_must_match(index):
+    assert index.search("disk ZFS") == []
+
+
+@pytest.mark.parametrize("query", ['"', "disk OR", "NEAR(disk", "*", "disk -usage", "col:disk"])
+def test_fts_syntax_in_queries_is_harmless(index, query):
+    index.search(query)
+
+
+def test_errors_are_not_indexed(index):
+    assert index.search("indexed") == []
+
+
+def test_duplicate_entries_are_ignored(index):
+    index.add("s2", 0, {"role": "assistant", "agent": "tech_chat", "result": "ZFS checksums everything."})
+    assert len(index.search("ZFS")) == 1
+
+
+def test_backfill_indexes_saved_sessions(tmp_path):
+    sessions = tmp_path / "sessions"
+    sessions.mkdir()
+    (sessions / "index.json").write_text(json.dumps({"sessions": []}))
+    (sessions / "abc.json").write_text(json.dumps({
+        "id": "abc", "history": [{"role": "user", "text": "restart nginx", "timestamp": "12:00"}]
+    }))
+    (sessions / "broken.json").write_text("{")
+
+    index = flux_ai.ChatHistoryIndex(tmp_path / "history.db")
+    assert index.is_empty()
+    index.backfill(sessions)
+    assert not index.is_empty()
+    assert [(r["session_id"], r["content"]) for r in index.search("nginx")] == [("abc", "restart nginx")]